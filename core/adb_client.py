@@ -0,0 +1,356 @@
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import closing
+
+from core.adb_session import ShellResult
+
+ADB_HOST = os.environ.get("ANDROID_ADB_SERVER_ADDRESS", "127.0.0.1")
+ADB_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+SYNC_DATA_MAX = 64 * 1024  # Taille maximale d'un bloc DATA du protocole sync
+
+# Identifiants des paquets du protocole shell v2
+SHELL_STDIN, SHELL_STDOUT, SHELL_STDERR, SHELL_EXIT, SHELL_CLOSE_STDIN = range(5)
+SHELL_HEADER = struct.Struct("<BI")
+SYNC_HEADER = struct.Struct("<4sI")
+
+
+class AdbError(RuntimeError):
+    """Requête refusée par le serveur ADB (réponse FAIL)"""
+
+
+def _recv_exact(sock, size):
+    """Lit exactement size octets (recv_into dans un tampon alloué une fois)"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Connexion ADB fermée")
+        received += count
+    return buffer
+
+
+def _send_request(sock, request):
+    payload = request.encode("utf-8")
+    sock.sendall(b"%04x" % len(payload) + payload)
+
+
+def _read_status(sock):
+    status = bytes(_recv_exact(sock, 4))
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        length = int(_recv_exact(sock, 4), 16)
+        raise AdbError(_recv_exact(sock, length).decode("utf-8", errors="replace"))
+    raise AdbError(f"Réponse ADB inattendue: {status!r}")
+
+
+class ShellStream:
+    """Session `shell,v2,raw:` sur une socket, avec l'interface Popen utilisée par AdbShellSession
+
+    stdin.write envoie des paquets STDIN, stdout.readline reconstitue les
+    lignes des paquets STDOUT/STDERR (fusionnés, comme stderr=STDOUT) et
+    le paquet EXIT fournit returncode.
+    """
+
+    def __init__(self, sock, timeout=None):
+        self._sock = sock
+        self._sock.settimeout(timeout)  # None pour une session longue (délais gérés par AdbShellSession)
+        self._pending = bytearray()
+        self._exited = threading.Event()
+        self.returncode = None
+        self.stdin = _ShellStdin(sock)
+        self.stdout = self
+
+    def _finish(self, returncode):
+        if self.returncode is None:
+            self.returncode = returncode
+        self._exited.set()
+        self._sock.close()
+
+    def readline(self):
+        while True:
+            end = self._pending.find(b"\n")
+            if end >= 0:
+                line = bytes(self._pending[:end + 1])
+                del self._pending[:end + 1]
+                return line
+            if self._exited.is_set():
+                line = bytes(self._pending)
+                self._pending.clear()
+                return line
+            try:
+                packet_id, length = SHELL_HEADER.unpack(_recv_exact(self._sock, SHELL_HEADER.size))
+                data = _recv_exact(self._sock, length) if length else b""
+            except TimeoutError:
+                self.kill()
+                raise
+            except OSError:
+                self._finish(-1)  # Socket fermée sans paquet EXIT
+                continue
+            if packet_id in (SHELL_STDOUT, SHELL_STDERR):
+                self._pending += data
+            elif packet_id == SHELL_EXIT:
+                self._finish(data[0] if data else 0)
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self._exited.wait(timeout):
+            raise subprocess.TimeoutExpired("adb shell", timeout)
+        return self.returncode
+
+    def kill(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)  # Débloque le thread lecteur
+        except OSError:
+            pass
+        self._finish(-9)
+
+
+class _ShellStdin:
+    def __init__(self, sock):
+        self._sock = sock
+
+    def write(self, data):
+        self._sock.sendall(SHELL_HEADER.pack(SHELL_STDIN, len(data)) + data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        try:
+            self._sock.sendall(SHELL_HEADER.pack(SHELL_CLOSE_STDIN, 0))
+        except OSError:
+            pass
+
+
+class AdbClient:
+    """Client du protocole hôte ADB (TCP 5037), sans passer par le binaire adb
+
+    Chaque service (shell:, exec:, sync:) consomme une connexion déjà
+    basculée sur l'appareil (host:transport). Un thread de fond garde
+    pool_size connexions de ce type prêtes: une commande ne paie plus que
+    son propre aller-retour. Les sorties binaires sont lues par recv_into
+    dans des tampons réutilisés.
+    """
+
+    def __init__(self, serial=None, host=ADB_HOST, port=ADB_PORT, pool_size=2, timeout=10):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = deque()
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._closed = False
+        self._refiller = None
+        self._features = None
+
+    def _connect(self):
+        """Socket vers le serveur ADB (démarré via `adb start-server` s'il ne répond pas)"""
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except ConnectionRefusedError:
+            if self.host not in ("127.0.0.1", "localhost") or shutil.which("adb") is None:
+                raise
+            subprocess.run(["adb", "start-server"], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=self.timeout)
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def host_request(self, request):
+        """Requête au serveur lui-même (host:version, host:devices...), retourne la réponse"""
+        with closing(self._connect()) as sock:
+            _send_request(sock, request)
+            _read_status(sock)
+            length = int(_recv_exact(sock, 4), 16)
+            return _recv_exact(sock, length).decode("utf-8", errors="replace")
+
+    def devices(self):
+        """Appareils connus du serveur: liste de (numéro de série, état)"""
+        lines = self.host_request("host:devices").splitlines()
+        return [tuple(line.split("\t", 1)) for line in lines if "\t" in line]
+
+    def features(self):
+        """Fonctionnalités de l'appareil (shell_v2, stat_v2...), mises en cache"""
+        if self._features is None:
+            prefix = f"host-serial:{self.serial}" if self.serial else "host"
+            self._features = set(self.host_request(f"{prefix}:features").split(","))
+        return self._features
+
+    def get_serialno(self):
+        """Numéro de série de l'appareil selon le serveur (utile sans serial explicite)"""
+        prefix = f"host-serial:{self.serial}" if self.serial else "host"
+        return self.host_request(f"{prefix}:get-serialno").strip()
+
+    def _transport(self):
+        sock = self._connect()
+        try:
+            _send_request(sock, f"host:transport:{self.serial}" if self.serial else "host:transport-any")
+            _read_status(sock)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _refill_loop(self):
+        """Thread de fond: garde pool_size connexions basculées sur l'appareil"""
+        while not self._closed:
+            self._wanted.wait()
+            self._wanted.clear()
+            while not self._closed and len(self._pool) < self.pool_size:
+                try:
+                    sock = self._transport()
+                except Exception:
+                    break  # Appareil ou serveur indisponible: nouvel essai à la prochaine demande
+                with self._lock:
+                    self._pool.append(sock)
+                if self._closed:
+                    self.reset()
+
+    def _take(self):
+        with self._lock:
+            sock = self._pool.popleft() if self._pool else None
+            if self.pool_size and self._refiller is None:
+                self._refiller = threading.Thread(target=self._refill_loop, daemon=True)
+                self._refiller.start()
+        self._wanted.set()
+        return sock
+
+    def _start_service(self, sock, service):
+        try:
+            _send_request(sock, service)
+            _read_status(sock)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def open(self, service, timeout=None):
+        """Ouvre un service appareil et retourne la socket connectée"""
+        sock = self._take()
+        if sock is not None:
+            try:
+                sock.settimeout(timeout or self.timeout)
+                return self._start_service(sock, service)
+            except OSError:
+                pass  # Connexion du pool périmée (appareil ou serveur redémarré)
+        sock = self._transport()
+        sock.settimeout(timeout or self.timeout)
+        return self._start_service(sock, service)
+
+    def open_shell(self):
+        """Shell interactif sans pty (protocole v2), pour AdbShellSession"""
+        return ShellStream(self.open("shell,v2,raw:"))
+
+    def shell(self, command, timeout=None):
+        """Exécute une commande (protocole shell v2) et retourne un ShellResult"""
+        timeout = timeout or self.timeout
+        stream = ShellStream(self.open(f"shell,v2,raw:{command}", timeout), timeout)
+        chunks = iter(stream.readline, b"")
+        output = b"".join(chunks).decode("utf-8", errors="replace")
+        return ShellResult(output, stream.returncode)
+
+    def exec_out(self, command, timeout=None):
+        """Sortie binaire brute d'un service exec: (comme `adb exec-out`)"""
+        buffer, size = self.exec_out_into(command, timeout=timeout)
+        return bytes(memoryview(buffer)[:size])
+
+    def exec_out_into(self, command, buffer=None, timeout=None):
+        """Lit la sortie d'exec: directement dans un tampon préalloué
+
+        Le tampon est réutilisé d'un appel à l'autre; s'il est trop petit, il
+        est remplacé par un tampon deux fois plus grand. Retourne (tampon,
+        nombre d'octets lus).
+        """
+        if buffer is None:
+            buffer = bytearray(1 << 20)
+        with closing(self.open(f"exec:{command}", timeout)) as sock:
+            size = 0
+            while True:
+                if size == len(buffer):
+                    # Nouveau tampon plutôt qu'agrandissement: des vues numpy peuvent encore pointer sur l'ancien
+                    grown = bytearray(len(buffer) * 2)
+                    grown[:size] = buffer
+                    buffer = grown
+                count = sock.recv_into(memoryview(buffer)[size:])
+                if count == 0:
+                    return buffer, size
+                size += count
+
+    def _sync(self, timeout=None):
+        return closing(self.open("sync:", timeout))
+
+    @staticmethod
+    def _sync_request(sock, command, path):
+        path = path.encode("utf-8")
+        sock.sendall(SYNC_HEADER.pack(command, len(path)) + path)
+
+    @staticmethod
+    def _sync_fail(sock, length):
+        return AdbError(_recv_exact(sock, length).decode("utf-8", errors="replace"))
+
+    def push(self, data, remote_path, mode=0o644, mtime=None, timeout=None):
+        """Écrit data (octets) dans remote_path sur l'appareil (protocole sync)"""
+        with self._sync(timeout) as sock:
+            self._sync_request(sock, b"SEND", f"{remote_path},{mode}")
+            view = memoryview(data)
+            for start in range(0, len(view), SYNC_DATA_MAX):
+                chunk = view[start:start + SYNC_DATA_MAX]
+                sock.sendall(SYNC_HEADER.pack(b"DATA", len(chunk)))
+                sock.sendall(chunk)
+            sock.sendall(SYNC_HEADER.pack(b"DONE", int(mtime or time.time())))
+            status, length = SYNC_HEADER.unpack(_recv_exact(sock, SYNC_HEADER.size))
+            if status != b"OKAY":
+                raise self._sync_fail(sock, length)
+            sock.sendall(SYNC_HEADER.pack(b"QUIT", 0))
+
+    def pull(self, remote_path, timeout=None):
+        """Lit un fichier de l'appareil (protocole sync), retourne ses octets"""
+        data = bytearray()
+        with self._sync(timeout) as sock:
+            self._sync_request(sock, b"RECV", remote_path)
+            while True:
+                status, length = SYNC_HEADER.unpack(_recv_exact(sock, SYNC_HEADER.size))
+                if status == b"DATA":
+                    data += _recv_exact(sock, length)
+                elif status == b"DONE":
+                    break
+                else:
+                    raise self._sync_fail(sock, length)
+            sock.sendall(SYNC_HEADER.pack(b"QUIT", 0))
+        return bytes(data)
+
+    def stat(self, remote_path, timeout=None):
+        """(mode, taille, mtime) d'un fichier de l'appareil; mode vaut 0 s'il n'existe pas"""
+        with self._sync(timeout) as sock:
+            self._sync_request(sock, b"STAT", remote_path)
+            status, mode, size, mtime = struct.unpack("<4s3I", _recv_exact(sock, 16))
+            if status != b"STAT":
+                raise AdbError(f"Réponse sync inattendue: {status!r}")
+            sock.sendall(SYNC_HEADER.pack(b"QUIT", 0))
+        return mode, size, mtime
+
+    def reset(self):
+        """Ferme les connexions préparées (elles seront recréées à la demande)"""
+        with self._lock:
+            pool, self._pool = self._pool, deque()
+        for sock in pool:
+            sock.close()
+
+    def close(self):
+        self._closed = True
+        self._wanted.set()
+        self.reset()
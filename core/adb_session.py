@@ -0,0 +1,146 @@
+import subprocess
+import threading
+import queue
+import time
+import uuid
+from collections import namedtuple
+
+ShellResult = namedtuple("ShellResult", ["output", "returncode"])
+
+
+class AdbShellSession:
+    """Session `adb shell` persistante partagée par toutes les commandes d'un appareil
+
+    Les commandes sont écrites sur l'entrée standard d'un unique processus
+    `adb shell`. Chaque commande est suivie d'un marqueur (sentinelle) qui
+    contient le code de retour, ce qui permet de découper la sortie sans
+    relancer de processus. Avec un AdbClient (client), la session passe par
+    une socket shell v2 au lieu d'un processus adb. Attention: une commande
+    qui lit stdin (cat sans argument, etc.) consommerait les commandes
+    suivantes.
+    """
+
+    def __init__(self, adb_prefix=("adb",), timeout=10, client=None):
+        self.adb_prefix = list(adb_prefix)
+        self.timeout = timeout
+        self.client = client
+        self._marker = f"__ADB_FIN_{uuid.uuid4().hex[:8]}__"
+        self._lock = threading.Lock()
+        self._process = None
+        self._lines = None
+        self._counter = 0
+
+    def start(self):
+        """Ouvre (ou rouvre) la session shell"""
+        self.close()
+        if self.client is not None:
+            self._process = self.client.open_shell()
+        else:
+            self._process = subprocess.Popen(
+                self.adb_prefix + ["shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0
+            )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._reader, args=(self._process, self._lines),
+                         daemon=True).start()
+
+    @staticmethod
+    def _reader(process, lines):
+        """Lit la sortie du shell ligne par ligne (thread dédié)"""
+        for line in iter(process.stdout.readline, b""):
+            lines.put(line)
+        lines.put(None)  # Fin de flux: la session est tombée
+
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def close(self):
+        """Ferme la session si elle est ouverte"""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def run(self, command, timeout=None):
+        """Exécute une commande et attend son résultat (API bloquante)"""
+        return self.run_batch([command], timeout=timeout)[0]
+
+    def run_batch(self, commands, timeout=None):
+        """Exécute plusieurs commandes en un seul aller-retour
+
+        Toutes les commandes sont envoyées d'un bloc, puis les sorties sont
+        récupérées dans l'ordre. Retourne une liste de ShellResult.
+        """
+        if not commands:
+            return []
+        timeout = self.timeout if timeout is None else timeout
+
+        with self._lock:
+            for attempt in range(2):
+                if not self.is_alive():
+                    self.start()
+                try:
+                    ids = self._send(commands)
+                except OSError as e:
+                    # Session tombée avant l'envoi: on peut rejouer sans risque
+                    print(f"Session ADB perdue ({str(e)}) - Reconnexion...")
+                    self.close()
+                    continue
+                return self._collect(ids, timeout)
+            raise RuntimeError("Impossible d'ouvrir une session adb shell")
+
+    def _send(self, commands):
+        ids = []
+        payload = []
+        for command in commands:
+            self._counter += 1
+            ids.append(self._counter)
+            payload.append(f"{command}\necho {self._marker}:{self._counter}:$?\n")
+        self._process.stdin.write("".join(payload).encode("utf-8"))
+        self._process.stdin.flush()
+        return ids
+
+    def _collect(self, ids, timeout):
+        marker = self._marker.encode("ascii")
+        deadline = time.monotonic() + timeout
+        results = []
+        output = []
+
+        while len(results) < len(ids):
+            remaining = deadline - time.monotonic()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                # L'état du flux est inconnu: on repart d'une session neuve
+                self.close()
+                raise TimeoutError(f"Pas de réponse du shell ADB après {timeout}s")
+            if line is None:
+                self.close()
+                raise ConnectionError("Session adb shell interrompue")
+
+            pos = line.find(marker)
+            if pos < 0:
+                output.append(line)
+                continue
+
+            # Sortie sans saut de ligne final: le marqueur est collé au texte
+            output.append(line[:pos])
+            _, counter, status = line[pos:].strip().split(b":")
+            if int(counter) != ids[len(results)]:
+                output = []  # Reste d'un échange précédent
+                continue
+            text = b"".join(output).decode("utf-8", errors="replace")
+            results.append(ShellResult(text.replace("\r\n", "\n"), int(status)))
+            output = []
+
+        return results
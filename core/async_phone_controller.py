@@ -0,0 +1,153 @@
+import asyncio
+import time
+import uuid
+
+import cv2
+
+from core.adb_session import ShellResult
+from core.phone_controller import RAW_TO_BGR, parse_raw_screencap
+
+
+async def _kill(process):
+    """Tue un processus adb; l'attente est bornée car un sous-processus peut garder les tubes ouverts"""
+    if process.returncode is None:
+        process.kill()
+    try:
+        await asyncio.wait_for(process.wait(), 2)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _remaining(timeout, deadline):
+    """Délai effectif: le plus court entre timeout et l'échéance absolue (time.monotonic)"""
+    if deadline is None:
+        return timeout
+    left = max(deadline - time.monotonic(), 0)
+    return left if timeout is None else min(timeout, left)
+
+
+class AsyncShellSession:
+    """Équivalent asyncio de AdbShellSession: un `adb shell` persistant à sentinelles
+
+    Une annulation ou un dépassement de délai pendant une commande ferme la
+    session (le flux serait désynchronisé); elle est rouverte à l'appel suivant.
+    """
+
+    def __init__(self, adb_prefix):
+        self.adb_prefix = list(adb_prefix)
+        self._marker = f"__ADB_FIN_{uuid.uuid4().hex[:8]}__".encode("ascii")
+        self._process = None
+        self._lock = asyncio.Lock()
+        self._counter = 0
+
+    async def _ensure_started(self):
+        if self._process is None or self._process.returncode is not None:
+            self._process = await asyncio.create_subprocess_exec(
+                *self.adb_prefix, "shell",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT
+            )
+
+    async def run(self, command, timeout=10):
+        # L'attente du verrou compte dans le délai: sous contention, l'échéance reste respectée
+        return await asyncio.wait_for(self._locked_exchange(command), timeout)
+
+    async def _locked_exchange(self, command):
+        async with self._lock:
+            try:
+                return await self._exchange(command)
+            except BaseException:
+                # Annulation, délai dépassé ou session tombée: on repart de zéro
+                await self.close()
+                raise
+
+    async def _exchange(self, command):
+        await self._ensure_started()
+        self._counter += 1
+        self._process.stdin.write(f"{command}\necho {self._marker.decode()}:{self._counter}:$?\n".encode("utf-8"))
+        await self._process.stdin.drain()
+
+        output = []
+        while True:
+            line = await self._process.stdout.readline()
+            if not line:
+                raise ConnectionError("Session adb shell interrompue")
+            pos = line.find(self._marker)
+            if pos < 0:
+                output.append(line)
+                continue
+            output.append(line[:pos])
+            _, counter, status = line[pos:].strip().split(b":")
+            if int(counter) != self._counter:
+                output = []
+                continue
+            text = b"".join(output).decode("utf-8", errors="replace").replace("\r\n", "\n")
+            return ShellResult(text, int(status))
+
+    async def close(self):
+        process, self._process = self._process, None
+        if process is not None:
+            await _kill(process)
+
+
+class AsyncPhoneController:
+    """Contrôle ADB non bloquant: capture, détection et entrées dans une même boucle asyncio
+
+    Chaque méthode accepte timeout (secondes) et deadline (échéance absolue
+    en time.monotonic()) et peut être annulée: le processus adb en cours
+    est alors tué. Les commandes shell passent par une session persistante,
+    la capture par `exec-out screencap` (framebuffer brut).
+    """
+
+    def __init__(self, device_id=None, timeout=10):
+        self.device_id = device_id
+        self.adb_prefix = ["adb"] if not device_id else ["adb", "-s", device_id]
+        self.timeout = timeout
+        self.session = AsyncShellSession(self.adb_prefix)
+
+    def _timeout(self, timeout):
+        return timeout if timeout is not None else self.timeout
+
+    async def _exec_out(self, command, timeout=None, deadline=None):
+        """Sortie binaire d'une commande exec-out, processus tué si annulé ou trop long"""
+        process = await asyncio.create_subprocess_exec(
+            *self.adb_prefix, "exec-out", command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(), _remaining(self._timeout(timeout), deadline))
+        finally:
+            if process.returncode is None:
+                await _kill(process)
+        if process.returncode != 0:
+            raise RuntimeError(f"Erreur ADB: {stderr.decode(errors='replace').strip()}")
+        return stdout
+
+    async def shell(self, command, timeout=None, deadline=None):
+        """Exécute une commande shell et retourne sa sortie"""
+        result = await self.session.run(command, _remaining(self._timeout(timeout), deadline))
+        return result.output.strip()
+
+    async def tap(self, x, y, timeout=None, deadline=None):
+        return await self.shell(f"input tap {int(x)} {int(y)}", timeout, deadline)
+
+    async def swipe(self, x1, y1, x2, y2, duration_ms=300, timeout=None, deadline=None):
+        return await self.shell(
+            f"input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration_ms)}",
+            timeout, deadline)
+
+    async def capture(self, timeout=None, deadline=None):
+        """Capture l'écran et retourne une image BGR
+
+        La conversion est faite dans un thread pour ne pas bloquer la boucle.
+        """
+        data = await self._exec_out("screencap", timeout, deadline)
+        rgba, pixel_format = parse_raw_screencap(data)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, cv2.cvtColor, rgba, RAW_TO_BGR[pixel_format])
+
+    async def close(self):
+        await self.session.close()
@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """Détection de changement d'écran par blocs
+
+    L'image en niveaux de gris est réduite à une grille de blocs (moyenne de
+    chaque bloc via INTER_AREA), puis comparée à une grille de référence. Un
+    bloc est considéré modifié si sa moyenne s'écarte de plus de tolerance
+    de la référence; seule la référence des blocs modifiés (ceux qui
+    provoquent un recalcul) est mise à jour. Une variation lente (fondu,
+    animation) finit donc par dépasser tolerance au lieu d'être comparée
+    à chaque fois à l'image précédente. Coût: un redimensionnement et une
+    soustraction sur quelques centaines de valeurs.
+    """
+
+    def __init__(self, grid=(32, 18), tolerance=3.0):
+        self.grid = grid              # (colonnes, lignes)
+        self.tolerance = tolerance
+        self._reference = None  # Grille des images sur lesquelles les résultats ont été calculés
+
+    def reset(self):
+        self._reference = None
+
+    def update(self, gray):
+        """Compare l'image à la référence, retourne la grille booléenne des blocs modifiés"""
+        blocks = cv2.resize(gray, self.grid, interpolation=cv2.INTER_AREA).astype(np.int16)
+        reference = self._reference
+        if reference is None or reference.shape != blocks.shape:
+            self._reference = blocks
+            return np.ones(blocks.shape, dtype=bool)
+        changed = np.abs(blocks - reference) > self.tolerance
+        reference[changed] = blocks[changed]
+        return changed
+
+    def region_changed(self, changed, roi, frame_shape):
+        """Indique si un bloc recouvrant la zone roi (x1, y1, x2, y2) a changé
+
+        roi None = image entière.
+        """
+        if roi is None:
+            return bool(changed.any())
+        height, width = frame_shape[:2]
+        cols, rows = self.grid
+        x1, y1, x2, y2 = roi
+        c1, c2 = x1 * cols // width, -(-x2 * cols // width)
+        r1, r2 = y1 * rows // height, -(-y2 * rows // height)
+        return bool(changed[r1:r2, c1:c2].any())
@@ -0,0 +1,301 @@
+import multiprocessing
+import os
+import queue
+import subprocess
+import time
+
+from core.adb_client import AdbClient
+
+
+def list_devices():
+    """Numéros de série des appareils prêts (état "device")
+
+    Interroge directement le serveur ADB, sinon `adb devices`.
+    """
+    try:
+        client = AdbClient()
+        try:
+            devices = client.devices()
+        finally:
+            client.close()
+    except Exception:
+        result = subprocess.run(["adb", "devices"], stdout=subprocess.PIPE, text=True, timeout=10)
+        devices = [tuple(line.split("\t", 1)) for line in result.stdout.splitlines()[1:] if "\t" in line]
+    return [serial for serial, state in devices if state.strip() == "device"]
+
+
+def available_cores():
+    """Cœurs autorisés pour ce processus (affinité courante, ex: taskset ou conteneur)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cores(count, cores=None):
+    """Répartit les cœurs entre count processus: liste d'ensembles de cœurs disjoints si possible"""
+    cores = list(cores) if cores is not None else available_cores()
+    if count <= 0:
+        return []
+    if count >= len(cores):
+        return [{cores[i % len(cores)]} for i in range(count)]
+    share = len(cores) // count
+    return [set(cores[i * share:(i + 1) * share]) for i in range(count)]
+
+
+def set_affinity(pid, cores):
+    """Limite un processus (0: le processus courant) à cores; False si impossible"""
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(pid, cores)
+    except OSError as e:
+        print(f"⚠️ Affinité {sorted(cores)} non appliquée au processus {pid}: {str(e)}")
+        return False
+    return True
+
+
+class WorkerContext:
+    """Côté processus de travail: appareil, demande d'arrêt et compteurs de débit
+
+    Les compteurs sont envoyés au superviseur par lots (au plus une fois
+    par flush_interval) pour ne pas ralentir la boucle de travail. À chaque
+    lot, le pool de correspondance suit l'affinité courante (le superviseur
+    la modifie quand des appareils arrivent ou partent).
+    """
+
+    def __init__(self, serial, stats_queue, stop_event, cores, flush_interval=1.0):
+        self.serial = serial
+        self.cores = cores
+        self._queue = stats_queue
+        self._stop_event = stop_event
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self.flush_interval = flush_interval
+
+    @property
+    def stopping(self):
+        return self._stop_event.is_set()
+
+    def count(self, name, amount=1):
+        """Ajoute amount au compteur name (images, détections, chargements...)"""
+        self._pending[name] = self._pending.get(name, 0) + amount
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            try:
+                self._queue.put_nowait((self.serial, self._pending))
+            except queue.Full:
+                return  # Superviseur en retard: les compteurs seront envoyés au prochain lot
+            self._pending = {}
+        self._last_flush = time.monotonic()
+        self._sync_cores()
+
+    def _sync_cores(self):
+        if not self.cores or not hasattr(os, "sched_getaffinity"):
+            return
+        cores = os.sched_getaffinity(0)
+        if cores != self.cores:
+            self.cores = cores
+            from core.matching import set_pool_size
+            set_pool_size(len(cores))
+
+
+def _worker_main(target, serial, stats_queue, stop_event, cores):
+    """Point d'entrée d'un processus de travail (un par appareil)"""
+    if not set_affinity(0, cores):
+        cores = None
+    # La détection du processus n'utilise que ses propres cœurs
+    from core.matching import set_pool_size
+    set_pool_size(len(cores) if cores else None)
+
+    context = WorkerContext(serial, stats_queue, stop_event, cores)
+    try:
+        target(context)
+    finally:
+        context.flush()
+
+
+class _DeviceWorker:
+    def __init__(self, serial):
+        self.serial = serial
+        self.process = None
+        self.started_at = None
+        self.first_start = None
+        self.restarts = 0
+        self.failures = 0  # Échecs consécutifs (pour l'attente avant relance)
+        self.next_start = 0.0
+        self.last_exit = None
+        self.finished = False
+        self.counters = {}
+
+
+class DeviceFarm:
+    """Ferme d'appareils: un processus isolé par numéro de série, supervisé
+
+    target(context) est exécuté dans un processus par appareil (context:
+    WorkerContext). Il doit être une fonction de module (importable par le
+    processus fils). Un processus qui plante est relancé après une attente
+    croissante (restart_delay, doublée à chaque échec consécutif jusqu'à
+    max_restart_delay); un processus qui se termine normalement n'est pas
+    relancé. Les appareils branchés en cours de route sont détectés toutes
+    les scan_interval secondes. Chaque processus est limité à sa part des
+    cœurs autorisés (affinité + taille du pool de correspondance); les parts
+    sont recalculées et réappliquées quand l'ensemble des appareils change.
+    """
+
+    def __init__(self, target, serials=None, restart_delay=5, max_restart_delay=300,
+                 scan_interval=10, stop_timeout=10):
+        self.target = target
+        self.fixed_serials = list(serials) if serials else None
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.scan_interval = scan_interval
+        self.stop_timeout = stop_timeout
+        self._context = multiprocessing.get_context("spawn")  # Processus vierges, comme sous Windows
+        self._stats_queue = self._context.Queue(maxsize=10000)
+        self._stop_event = self._context.Event()
+        self.workers = {}
+        self._connected = set()
+        self._last_scan = 0.0
+        self._cores = available_cores()
+        self._layout = {}  # {numéro de série: cœurs} des appareils actifs
+
+    def _scan(self):
+        serials = self.fixed_serials if self.fixed_serials is not None else list_devices()
+        for serial in serials:
+            if serial not in self.workers:
+                print(f"📱 Nouvel appareil: {serial}")
+                self.workers[serial] = _DeviceWorker(serial)
+        self._connected = set(serials)
+        self._last_scan = time.monotonic()
+
+    def _active_serials(self):
+        return sorted(serial for serial, worker in self.workers.items()
+                      if serial in self._connected and not worker.finished)
+
+    def _rebalance(self):
+        """Recalcule la part de cœurs de chaque appareil actif et la réapplique aux processus en cours"""
+        serials = self._active_serials()
+        layout = dict(zip(serials, assign_cores(len(serials), self._cores)))
+        if layout == self._layout:
+            return
+        self._layout = layout
+        for serial, cores in layout.items():
+            process = self.workers[serial].process
+            if process is not None and process.is_alive():
+                set_affinity(process.pid, cores)
+
+    def _spawn(self, worker):
+        cores = self._layout.get(worker.serial)
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(self.target, worker.serial, self._stats_queue, self._stop_event, cores),
+            name=f"farm-{worker.serial}",
+            daemon=True
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        if worker.first_start is None:
+            worker.first_start = worker.started_at
+
+    def _drain_stats(self):
+        while True:
+            try:
+                serial, counters = self._stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            worker = self.workers.get(serial)
+            if worker is not None:
+                for name, amount in counters.items():
+                    worker.counters[name] = worker.counters.get(name, 0) + amount
+
+    def supervise_once(self):
+        """Une passe de supervision: découverte, statistiques, relance des processus tombés"""
+        now = time.monotonic()
+        if now - self._last_scan >= self.scan_interval:
+            try:
+                self._scan()
+            except Exception as e:
+                print(f"⚠️ Découverte des appareils impossible: {str(e)}")
+        self._drain_stats()
+
+        for worker in self.workers.values():
+            process = worker.process
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                worker.process = None
+                worker.last_exit = process.exitcode
+                if process.exitcode == 0:
+                    print(f"✅ {worker.serial}: travail terminé")
+                    worker.finished = True
+                    continue
+                uptime = now - worker.started_at
+                worker.failures = 1 if uptime > self.max_restart_delay else worker.failures + 1
+                delay = min(self.restart_delay * 2 ** (worker.failures - 1), self.max_restart_delay)
+                worker.next_start = now + delay
+                print(f"⚠️ {worker.serial}: processus arrêté (code {process.exitcode}), relance dans {delay:.0f}s")
+            if worker.finished or worker.serial not in self._connected or now < worker.next_start:
+                continue
+            if worker.first_start is not None:
+                worker.restarts += 1
+            self._rebalance()
+            self._spawn(worker)
+        self._rebalance()
+
+    def run(self, duration=None, interval=1.0, report_interval=60):
+        """Supervise jusqu'à duration secondes (ou Ctrl+C), puis arrête les processus"""
+        self._scan()
+        started = last_report = time.monotonic()
+        try:
+            while duration is None or time.monotonic() - started < duration:
+                self.supervise_once()
+                if all(worker.finished for worker in self.workers.values()) and self.workers:
+                    break
+                if report_interval and time.monotonic() - last_report >= report_interval:
+                    print(self.report())
+                    last_report = time.monotonic()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("Arrêt demandé...")
+        finally:
+            self.stop()
+        return self.stats()
+
+    def stop(self):
+        """Demande l'arrêt aux processus, puis termine ceux qui ne répondent pas"""
+        self._stop_event.set()
+        deadline = time.monotonic() + self.stop_timeout
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(max(deadline - time.monotonic(), 0))
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(1)
+        self._drain_stats()
+
+    def stats(self):
+        """Statistiques par appareil: relances, temps de fonctionnement, compteurs et débits (/s)"""
+        now = time.monotonic()
+        stats = {}
+        for serial, worker in self.workers.items():
+            uptime = now - worker.first_start if worker.first_start is not None else 0.0
+            stats[serial] = {
+                'running': worker.process is not None and worker.process.is_alive(),
+                'restarts': worker.restarts,
+                'last_exit': worker.last_exit,
+                'uptime_s': uptime,
+                'counters': dict(worker.counters),
+                'rates': {name: value / uptime for name, value in worker.counters.items()} if uptime else {},
+            }
+        return stats
+
+    def report(self):
+        lines = []
+        for serial, entry in self.stats().items():
+            rates = " | ".join(f"{name}: {rate:.2f}/s" for name, rate in sorted(entry['rates'].items()))
+            lines.append(f"{serial}: {'actif' if entry['running'] else 'arrêté'}, "
+                         f"{entry['restarts']} relance(s), {entry['uptime_s']:.0f}s | {rates or 'aucune donnée'}")
+        return "\n".join(lines)
@@ -0,0 +1,174 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_CACHE = os.path.join(os.path.expanduser("~"), ".entrainement", "device_profiles.json")
+PROFILE_TTL = 24 * 3600  # Secondes avant de sonder à nouveau l'appareil
+
+# Rotation de l'affichage (bien plus léger que dumpsys input, qui décrit tous les périphériques)
+ORIENTATION_COMMAND = "dumpsys window displays | grep -m 1 -E 'mCurrentRotation|mRotation='"
+
+# Commandes de vérification (un seul aller-retour): identité + taille + rotation
+CHECK_COMMANDS = [
+    "getprop ro.serialno",
+    "wm size",
+    ORIENTATION_COMMAND,
+]
+# Complément demandé seulement si le profil est absent ou périmé
+PROBE_COMMANDS = [
+    "getprop ro.product.model",
+    "wm density",
+]
+
+# Profils partagés par tous les PhoneController du processus, par numéro de série
+_profiles = {}
+_lock = threading.Lock()
+
+
+def parse_resolution(output):
+    match = re.search(r"(\d+)x(\d+)", output)
+    if match:
+        return (int(match.group(1)), int(match.group(2)))
+    raise RuntimeError("Impossible de parser la résolution")
+
+
+def parse_density(output):
+    match = re.search(r"(\d+)", output)
+    if match:
+        return int(match.group(1))
+    raise RuntimeError("Impossible de parser la densité")
+
+
+def parse_orientation(output):
+    """1 (paysage) pour une rotation de 90° ou 270°, 0 (portrait) sinon ou par défaut"""
+    match = re.search(r"(?:mCurrentRotation|mRotation)=(?:ROTATION_)?(\d+)", output)
+    if not match:
+        return 0
+    rotation = int(match.group(1))
+    return 1 if (rotation // 90 if rotation >= 90 else rotation) % 2 else 0
+
+
+def _read_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@contextmanager
+def _cache_lock(path):
+    """Verrou entre processus sur le cache (fichier .lock voisin)"""
+    with open(path + ".lock", "a+b") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _update_cache(path, update):
+    """Lecture-modification-écriture du cache sous verrou, remplacement atomique"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _cache_lock(path):
+        profiles = _read_cache(path)
+        update(profiles)
+        fd, tmp_path = tempfile.mkstemp(prefix=".device_profiles_", dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def _write_cache(path, serial, profile):
+    if not path:
+        return
+    try:
+        _update_cache(path, lambda profiles: profiles.update({serial: profile}))
+    except OSError as e:
+        print(f"Impossible d'enregistrer le profil appareil: {str(e)}")
+
+
+def load_device_profile(shell, device_id=None, ttl=PROFILE_TTL, cache_path=PROFILE_CACHE):
+    """Retourne le profil de l'appareil (modèle, résolution, densité, orientation)
+
+    Un aller-retour ADB suffit quand le profil est en cache (mémoire du
+    processus, sinon disque) et encore valide: la vérification lit le
+    numéro de série, la taille et la rotation, et le profil est invalidé si
+    l'une d'elles a changé ou si le TTL est dépassé.
+
+    device_id: numéro de série adb (ou fonction qui le retourne), clé du
+    cache quand ro.serialno est vide; "inconnu" seulement à défaut.
+    """
+    results = shell.run_batch(CHECK_COMMANDS, timeout=5)
+    if results[0].returncode != 0 or results[1].returncode != 0:
+        raise RuntimeError(f"Erreur ADB: {results[0].output.strip() or results[1].output.strip()}")
+
+    serial = results[0].output.strip()
+    if not serial:
+        serial = (device_id() if callable(device_id) else device_id) or "inconnu"
+    resolution = list(parse_resolution(results[1].output))
+    orientation = parse_orientation(results[2].output)
+
+    with _lock:
+        profile = _profiles.get(serial)
+    if profile is None:
+        profile = _read_cache(cache_path).get(serial)
+
+    valid = (profile is not None
+             and time.time() - profile.get("timestamp", 0) < ttl
+             and profile.get("resolution") == resolution)
+    if valid:
+        profile = dict(profile, orientation=orientation)
+    else:
+        model, density = (r.output.strip() for r in shell.run_batch(PROBE_COMMANDS, timeout=5))
+        profile = {
+            "serial": serial,
+            "model": model,
+            "resolution": resolution,
+            "density": parse_density(density),
+            "orientation": orientation,
+            "timestamp": time.time(),
+        }
+        _write_cache(cache_path, serial, profile)
+
+    with _lock:
+        _profiles[serial] = profile
+    return profile
+
+
+def invalidate_device_profile(serial=None, cache_path=PROFILE_CACHE):
+    """Oublie le profil d'un appareil (ou de tous) en mémoire et sur disque"""
+    def forget(profiles):
+        if serial is None:
+            profiles.clear()
+        else:
+            profiles.pop(serial, None)
+
+    with _lock:
+        forget(_profiles)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            _update_cache(cache_path, forget)
+        except OSError as e:
+            print(f"Impossible de mettre à jour le cache des profils: {str(e)}")
@@ -0,0 +1,124 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+import numpy as np
+
+
+class JsonLinesHandler(logging.Handler):
+    """Écrit les enregistrements en JSON Lines (UTF-8), par lots
+
+    Appelé par le thread du QueueListener: les lignes sont accumulées et
+    écrites en une fois dès que la file est vide ou que batch_size lignes
+    sont en attente.
+    """
+
+    def __init__(self, path, source_queue, batch_size=512):
+        super().__init__()
+        self.path = path
+        self.source_queue = source_queue
+        self.batch_size = batch_size
+        self._lines = []
+        self._file = open(path, "a", encoding="utf-8", buffering=1 << 16)
+
+    def emit(self, record):
+        entry = {"t": round(record.created, 6), "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        self._lines.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str))
+        if len(self._lines) >= self.batch_size or self.source_queue.empty():
+            self.flush()
+
+    def flush(self):
+        if self._lines and self._file is not None:
+            self._file.write("\n".join(self._lines) + "\n")
+            self._file.flush()
+            self._lines.clear()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+class _EventQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Événements: rien à formater dans le thread appelant
+        return record if hasattr(record, "fields") else super().prepare(record)
+
+
+class EventLog:
+    """Journal d'événements structuré qui ne bloque jamais l'appelant
+
+    event() ne fait que déposer l'enregistrement dans une file (QueueHandler);
+    la sérialisation et l'écriture ont lieu dans le thread du QueueListener.
+
+        log = EventLog("actions_log.jsonl")
+        log.event("latency", seconds=0.012, view="ville")
+    """
+
+    def __init__(self, path, batch_size=512, name=None):
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        self.handler = JsonLinesHandler(path, self.queue, batch_size)
+        self.logger = logging.getLogger(name or f"event_log.{path}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._queue_handler = _EventQueueHandler(self.queue)
+        self.logger.addHandler(self._queue_handler)
+        self.listener = logging.handlers.QueueListener(self.queue, self.handler)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def event(self, name, **fields):
+        # Enregistrement construit directement: pas de recherche de l'appelant par logging
+        record = logging.LogRecord(self.logger.name, logging.INFO, "", 0, name, None, None)
+        record.fields = fields
+        self._queue_handler.handle(record)
+
+    def attach(self, logger):
+        """Redirige aussi un logger existant vers ce journal (messages en champ "event")"""
+        logger.addHandler(self._queue_handler)
+
+    def close(self):
+        """Vide la file et ferme le fichier (appelé aussi à la sortie du programme)"""
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+        self.logger.removeHandler(self._queue_handler)
+        self.handler.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_events(path, event=None, buffer_size=1 << 20):
+    """Itère sur les enregistrements (dict) d'un journal, sans le charger en mémoire
+
+    Avec event, les lignes d'autres événements sont écartées avant décodage JSON.
+    """
+    marker = json.dumps({"event": event}, ensure_ascii=False, separators=(",", ":"))[1:-1].encode() if event else None
+    with open(path, "rb", buffering=buffer_size) as f:
+        for line in f:
+            if marker is not None and marker not in line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Ligne tronquée (programme interrompu pendant l'écriture)
+            if event is None or entry.get("event") == event:
+                yield entry
+
+
+def load_column(path, event, field, dtype=np.float64):
+    """Valeurs numériques d'un champ pour un événement (ex: latences), en tableau numpy"""
+    values = (entry[field] for entry in read_events(path, event) if field in entry)
+    return np.fromiter(values, dtype=dtype)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+Frame = namedtuple("Frame", ["seq", "timestamp", "image"])
+
+
+class FrameStream:
+    """Flux de captures continu publié dans un tampon circulaire de taille fixe
+
+    Un thread unique capture en boucle (framebuffer brut par défaut) et
+    publie chaque image avec un numéro de séquence croissant et l'heure de
+    capture. Quand les consommateurs prennent du retard, les images les plus
+    anciennes sont écrasées au lieu de s'accumuler.
+    """
+
+    def __init__(self, source, capacity=4, interval=0.0):
+        self.source = source          # Callable qui retourne une image (ou None)
+        self.interval = interval      # Pause minimale entre deux captures
+        self._frames = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._wake = threading.Event()
+        self._running = False
+        self._seq = 0
+        self.dropped = 0              # Images écrasées sans avoir été lues
+        self._last_read_seq = 0
+
+    @classmethod
+    def from_phone(cls, phone, capacity=4, interval=0.0):
+        """Flux alimenté par la capture brute d'un PhoneController"""
+        return cls(lambda: phone.capture_screen(mode="raw"), capacity, interval)
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def set_interval(self, interval):
+        """Change la pause entre captures; une pause plus courte prend effet tout de suite"""
+        shorter = interval < self.interval
+        self.interval = interval
+        if shorter:
+            self._wake.set()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._condition:
+            self._condition.notify_all()
+
+    def is_running(self):
+        return self._running
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _capture_loop(self):
+        while self._running:
+            started = time.time()
+            try:
+                image = self.source()
+            except Exception as e:
+                print(f"Erreur flux de capture: {str(e)}")
+                image = None
+
+            if image is not None:
+                self._publish(started, image)
+            else:
+                time.sleep(0.1)  # Évite de boucler à vide si l'appareil ne répond pas
+
+            if self.interval:
+                remaining = self.interval - (time.time() - started)
+                if remaining > 0:
+                    self._wake.wait(remaining)
+                    self._wake.clear()
+
+    def _publish(self, timestamp, image):
+        with self._condition:
+            self._seq += 1
+            if len(self._frames) == self._frames.maxlen and self._frames[0].seq > self._last_read_seq:
+                self.dropped += 1
+            self._frames.append(Frame(self._seq, timestamp, image))
+            self._condition.notify_all()
+
+    def latest_frame(self):
+        """Dernière image capturée (Frame) ou None si aucune"""
+        with self._condition:
+            if not self._frames:
+                return None
+            frame = self._frames[-1]
+            self._last_read_seq = max(self._last_read_seq, frame.seq)
+            return frame
+
+    def frames_since(self, seq):
+        """Images encore dans le tampon dont le numéro est supérieur à seq"""
+        with self._condition:
+            frames = [frame for frame in self._frames if frame.seq > seq]
+            if frames:
+                self._last_read_seq = max(self._last_read_seq, frames[-1].seq)
+            return frames
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """Attend une image plus récente que after_seq et retourne la dernière"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._running or (self._frames and self._frames[-1].seq > after_seq),
+                timeout=timeout
+            )
+            if not self._frames or self._frames[-1].seq <= after_seq:
+                return None
+            frame = self._frames[-1]
+            self._last_read_seq = max(self._last_read_seq, frame.seq)
+            return frame
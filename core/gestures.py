@@ -0,0 +1,171 @@
+from collections import namedtuple
+
+import numpy as np
+
+# kind: "tap", "long_press", "swipe", "zoom", "dezoom" ou "multi" (plusieurs doigts sans pincement net)
+# x, y: point de départ; dx, dy: déplacement du premier doigt; scale: écart final / écart initial
+Gesture = namedtuple("Gesture", ["kind", "start", "end", "x", "y", "dx", "dy", "scale", "velocity", "fingers"])
+
+
+class GestureRecognizer:
+    """Reconnaissance de gestes sur les trames de contacts (TOUCH_DTYPE, voir core.touch_events)
+
+    Les trames du geste en cours sont écrites dans des tableaux circulaires
+    préalloués (window trames x max_slots créneaux). Un geste se termine à
+    la première trame sans doigt; il est alors classé en une passe
+    vectorisée: déplacement et vitesse du premier doigt, rapport entre
+    l'écart final des deux premiers doigts (médiane des dernières trames)
+    et leur écart au début du geste. Les seuils sont dans l'unité des
+    coordonnées reçues.
+    """
+
+    def __init__(self, window=256, max_slots=10, tap_max_duration=0.3, tap_max_move=30,
+                 zoom_threshold=1.15, dezoom_threshold=0.85, min_gesture_duration=0.2, smoothing=3):
+        self.window = window
+        self.max_slots = max_slots
+        self.tap_max_duration = tap_max_duration
+        self.tap_max_move = tap_max_move
+        self.zoom_threshold = zoom_threshold
+        self.dezoom_threshold = dezoom_threshold
+        self.min_gesture_duration = min_gesture_duration
+        self.smoothing = smoothing  # Trames moyennées pour l'écart final entre doigts
+        self._times = np.zeros(window, dtype=np.float64)
+        self._x = np.zeros((window, max_slots), dtype=np.float32)
+        self._y = np.zeros((window, max_slots), dtype=np.float32)
+        self._active = np.zeros((window, max_slots), dtype=bool)
+        self._first = np.zeros((max_slots, 2), dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Abandonne le geste en cours"""
+        self._count = 0  # Trames du geste en cours (peut dépasser window)
+        self._start = None
+        self._seen = np.zeros(self.max_slots, dtype=bool)
+        self._primary = -1
+        self._start_distance = None
+        self._fingers = 0
+
+    def feed(self, contacts):
+        """Ajoute un lot de contacts, retourne la liste des gestes terminés dans ce lot"""
+        gestures = []
+        start = 0
+        for end in np.flatnonzero(contacts["slot"] < 0):
+            self._append(contacts[start:end])
+            gesture = self._finish()
+            if gesture is not None:
+                gestures.append(gesture)
+            start = end + 1
+        self._append(contacts[start:])
+        return gestures
+
+    def _append(self, rows):
+        if not len(rows):
+            return
+        frames, first_rows, frame_index = np.unique(rows["frame"], return_index=True, return_inverse=True)
+        count = len(frames)
+        times = rows["t"][first_rows]
+        slots = rows["slot"].astype(np.intp)
+        inside = slots < self.max_slots
+        frame_index, slots, rows = frame_index[inside], slots[inside], rows[inside]
+
+        x = np.zeros((count, self.max_slots), dtype=np.float32)
+        y = np.zeros((count, self.max_slots), dtype=np.float32)
+        active = np.zeros((count, self.max_slots), dtype=bool)
+        x[frame_index, slots] = rows["x"]
+        y[frame_index, slots] = rows["y"]
+        active[frame_index, slots] = True
+
+        if self._start is None:
+            self._start = float(times[0])
+        self._fingers = max(self._fingers, int(active.sum(axis=1).max()))
+
+        # Position de départ de chaque doigt (première trame où son créneau est actif)
+        new = active.any(axis=0) & ~self._seen
+        if new.any():
+            first_frame = active.argmax(axis=0)
+            for slot in np.flatnonzero(new):
+                self._first[slot] = (x[first_frame[slot], slot], y[first_frame[slot], slot])
+            self._seen |= new
+            if self._primary < 0:
+                self._primary = int(np.flatnonzero(active[0])[0]) if active[0].any() else int(np.flatnonzero(new)[0])
+
+        if self._start_distance is None:
+            distances, valid = self._pair_distances(x, y, active)
+            if valid.any():
+                self._start_distance = float(distances[valid.argmax()])
+
+        # Écriture circulaire: seules les window dernières trames sont gardées
+        keep = slice(max(count - self.window, 0), count)
+        positions = (self._count + np.arange(count)[keep]) % self.window
+        self._times[positions] = times[keep]
+        self._x[positions] = x[keep]
+        self._y[positions] = y[keep]
+        self._active[positions] = active[keep]
+        self._count += count
+
+    @staticmethod
+    def _pair_distances(x, y, active):
+        """Écart entre les deux premiers doigts actifs de chaque trame (vectorisé)"""
+        order = np.argsort(~active, axis=1, kind="stable")[:, :2]
+        valid = active.sum(axis=1) >= 2
+        rows = np.arange(len(x))[:, None]
+        px, py = x[rows, order], y[rows, order]
+        return np.hypot(px[:, 0] - px[:, 1], py[:, 0] - py[:, 1]), valid
+
+    def _ordered_window(self):
+        size = min(self._count, self.window)
+        positions = (self._count - size + np.arange(size)) % self.window
+        return self._times[positions], self._x[positions], self._y[positions], self._active[positions]
+
+    def current(self):
+        """Classement provisoire du geste en cours (None si aucun doigt)"""
+        if not self._count:
+            return None
+        return self._classify()
+
+    def _finish(self):
+        gesture = self._classify() if self._count else None
+        self.reset()
+        return gesture
+
+    def _classify(self):
+        times, x, y, active = self._ordered_window()
+        start, end = self._start, float(times[-1])
+        duration = end - start
+        slot = self._primary
+        x0, y0 = self._first[slot]
+
+        # Déplacement et vitesse maximale du premier doigt sur la fenêtre
+        seen = np.flatnonzero(active[:, slot])
+        last = seen[-1] if len(seen) else 0
+        dx, dy = float(x[last, slot] - x0), float(y[last, slot] - y0)
+        velocity = 0.0
+        if len(seen) >= 2:
+            dt = np.diff(times[seen])
+            steps = np.hypot(np.diff(x[seen, slot]), np.diff(y[seen, slot]))
+            moving = dt > 0
+            if moving.any():
+                velocity = float((steps[moving] / dt[moving]).max())
+
+        scale = 1.0
+        if self._fingers >= 2:
+            distances, valid = self._pair_distances(x, y, active)
+            if valid.any() and self._start_distance:
+                scale = float(np.median(distances[valid][-self.smoothing:])) / self._start_distance
+            if duration >= self.min_gesture_duration and scale > self.zoom_threshold:
+                kind = "zoom"
+            elif duration >= self.min_gesture_duration and scale < self.dezoom_threshold:
+                kind = "dezoom"
+            else:
+                kind = "multi"
+        elif np.hypot(dx, dy) <= self.tap_max_move:
+            kind = "tap" if duration <= self.tap_max_duration else "long_press"
+        else:
+            kind = "swipe"
+        return Gesture(kind, start, end, float(x0), float(y0), dx, dy, scale, velocity, self._fingers)
+
+
+def recognize(contacts, **options):
+    """Gestes d'une session enregistrée (tableau de contacts complet)"""
+    recognizer = GestureRecognizer(**options)
+    return recognizer.feed(contacts)
@@ -0,0 +1,89 @@
+import shlex
+
+from core.tracing import span
+
+
+class InputBatch:
+    """Suite d'entrées (taps, glissements, touches, attentes) envoyée en un seul aller-retour ADB
+
+    Les actions sont compilées en une chaîne de commandes shell exécutée
+    par la session persistante du téléphone; les attentes ont lieu sur
+    l'appareil (sleep) et non côté PC. Les touches consécutives sont
+    regroupées dans un seul `input keyevent` (chaque appel à `input`
+    démarre une VM sur l'appareil). La chaîne s'arrête à la première
+    commande en échec.
+
+        phone.batch().key("KEYCODE_POWER").wait(0.5).swipe(300, 1200, 300, 400, 200).run()
+    """
+
+    def __init__(self, phone):
+        self.phone = phone
+        self._actions = []  # (type, arguments)
+        self.duration = 0.0  # Durée estimée côté appareil (attentes + glissements)
+
+    def tap(self, x, y):
+        self._actions.append(("tap", (int(x), int(y))))
+        return self
+
+    def swipe(self, x1, y1, x2, y2, duration_ms=300):
+        self._actions.append(("swipe", (int(x1), int(y1), int(x2), int(y2), int(duration_ms))))
+        self.duration += duration_ms / 1000
+        return self
+
+    def key(self, *keycodes):
+        """Une ou plusieurs touches (KEYCODE_POWER, KEYCODE_BACK, 66...)"""
+        self._actions.append(("key", tuple(str(code) for code in keycodes)))
+        return self
+
+    def text(self, value):
+        """Saisie de texte (les espaces sont encodés %s comme l'exige `input text`)"""
+        self._actions.append(("text", (value.replace(" ", "%s"),)))
+        return self
+
+    def wait(self, seconds):
+        self._actions.append(("wait", (float(seconds),)))
+        self.duration += seconds
+        return self
+
+    def __len__(self):
+        return len(self._actions)
+
+    def compile(self):
+        """Chaîne de commandes shell correspondant au lot"""
+        commands = []
+        for kind, args in self._actions:
+            if kind == "key" and commands and commands[-1][0] == "key":
+                commands[-1] = ("key", commands[-1][1] + args)  # Touches consécutives: un seul appel
+            else:
+                commands.append((kind, args))
+
+        parts = []
+        for kind, args in commands:
+            if kind == "wait":
+                parts.append(f"sleep {args[0]:g}")
+            elif kind == "key":
+                parts.append("input keyevent " + " ".join(shlex.quote(code) for code in args))
+            elif kind == "text":
+                parts.append(f"input text {shlex.quote(args[0])}")
+            else:
+                parts.append(f"input {kind} " + " ".join(str(value) for value in args))
+        return " && ".join(parts)
+
+    def run(self, timeout=None):
+        """Exécute le lot; retourne True si toutes les commandes ont réussi"""
+        if not self._actions:
+            return True
+        script = self.compile()
+        if timeout is None:
+            # Marge par commande `input` en plus des attentes prévues
+            timeout = self.duration + 2 * len(self._actions) + 5
+        try:
+            with span("input"):
+                result = self.phone.shell.run(script, timeout=timeout)
+        except Exception as e:
+            print(f"Échec lot d'entrées: {str(e)}")
+            return False
+        if result.returncode != 0:
+            print(f"Échec lot d'entrées (code {result.returncode}): {result.output.strip()}")
+            return False
+        return True
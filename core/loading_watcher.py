@@ -0,0 +1,198 @@
+import re
+import socket
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from core.frame_stream import FrameStream
+
+# Événements du tampon "events" de logcat émis quand une activité passe au premier plan
+RESUME_TAGS = ("am_on_resume_called", "wm_on_resume_called", "am_resume_activity",
+               "am_activity_launch_time", "wm_activity_launch_time")
+
+
+class ActivityWatcher:
+    """Surveille logcat pour détecter la reprise (resume) d'une activité du package
+
+    logcat démarre à l'heure courante de l'appareil (-T calculé côté
+    appareil): les reprises antérieures au lancement ne sont pas rejouées.
+    En mode socket, le flux passe par le client ADB direct.
+    """
+
+    def __init__(self, phone, package, on_resume=None):
+        self.phone = phone
+        self.package = package
+        self.on_resume = on_resume
+        self.resumed = threading.Event()
+        self.resumed_at = None
+        self._process = None
+        self._sock = None
+        self._pattern = re.compile(r"(%s).*%s" % ("|".join(RESUME_TAGS), re.escape(package)))
+
+    def command(self):
+        filters = " ".join(f"{tag}:I" for tag in RESUME_TAGS)
+        return f"logcat -b events -T \"$(date '+%m-%d %H:%M:%S.000')\" {filters} '*:S'"
+
+    def start(self):
+        client = getattr(self.phone, "client", None)
+        try:
+            if client is not None:
+                self._sock = client.open(f"shell:{self.command()}")
+                self._sock.settimeout(None)  # Flux sans fin: arrêté par stop()
+                stream = self._sock.makefile("rb")
+            else:
+                self._process = subprocess.Popen(
+                    self.phone.adb_prefix + ["shell", self.command()],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL
+                )
+                stream = self._process.stdout
+        except Exception as e:
+            print(f"⚠️ logcat indisponible: {str(e)}")
+            return self
+        threading.Thread(target=self._read, args=(stream,), daemon=True).start()
+        return self
+
+    def _read(self, stream):
+        try:
+            for line in stream:
+                if self._pattern.search(line.decode("utf-8", errors="replace")):
+                    self.resumed_at = time.monotonic()
+                    self.resumed.set()
+                    if self.on_resume is not None:
+                        self.on_resume()
+        except (OSError, ValueError):
+            pass  # Flux fermé par stop()
+
+    def stop(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # Débloque le thread lecteur
+            except OSError:
+                pass
+            sock.close()
+        process, self._process = self._process, None
+        if process is not None:
+            process.terminate()
+
+
+class LoadingWatcher:
+    """Attend la fin du chargement du jeu sans interrogation à intervalle fixe
+
+    Le pixel témoin est lu dans la dernière capture d'un flux continu,
+    directement dans le framebuffer brut (pas de conversion de l'image
+    entière). L'intervalle entre deux captures commence court et s'allonge
+    (backoff) tant que le jeu n'est pas prêt; il revient au minimum dès que
+    logcat signale la reprise de l'activité du jeu. Les durées
+    jusqu'à la reprise et jusqu'à l'état prêt sont gardées dans metrics.
+    """
+
+    def __init__(self, phone, package, pixel, expected_color, tolerance=5, stream=None,
+                 min_interval=0.1, max_interval=2.0, backoff=1.5):
+        self.phone = phone
+        self.package = package
+        self.pixel = pixel                  # (x, y)
+        self.expected_color = np.array(expected_color)
+        self.tolerance = tolerance
+        self.stream = stream
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.metrics = {}
+
+    def is_ready(self, image):
+        """Vérifie uniquement le pixel témoin (image BGR)"""
+        if image is None:
+            return False
+        x, y = self.pixel
+        if y >= image.shape[0] or x >= image.shape[1]:
+            return False
+        return self.matches(image[y, x, :3])
+
+    def matches(self, color):
+        """Compare une couleur BGR à la couleur attendue"""
+        if color is None:
+            return False
+        return bool(np.all(np.abs(color.astype(int) - self.expected_color) <= self.tolerance))
+
+    def sample_pixel(self):
+        """Couleur BGR du pixel témoin, lue dans la capture brute sans convertir l'image"""
+        rgba, pixel_format = self.phone.capture_raw()
+        if rgba is None:
+            return None
+        x, y = self.pixel
+        if y >= rgba.shape[0] or x >= rgba.shape[1]:
+            return None
+        # Copie: la vue pointe sur un tampon réutilisé par la capture suivante
+        return rgba[y, x, :3].copy() if pixel_format == "BGRA" else rgba[y, x, 2::-1].copy()
+
+    def wait_until_ready(self, timeout=60, launch=None, on_sample=None):
+        """Attend que le pixel témoin ait la couleur attendue
+
+        launch: fonction appelée une fois logcat démarré (lancement du jeu).
+        on_sample: fonction appelée après chaque vérification négative.
+        Retourne True si le jeu est prêt avant timeout.
+        """
+        own_stream = self.stream is None
+        # Flux propre: chaque "image" est la seule couleur du pixel témoin
+        stream = FrameStream(self.sample_pixel, capacity=2) if own_stream else self.stream
+        previous_interval = stream.interval
+        activity = ActivityWatcher(self.phone, self.package,
+                                   on_resume=lambda: stream.set_interval(self.min_interval)).start()
+        stream.set_interval(self.min_interval)
+        stream.start()
+
+        start = time.monotonic()
+        self.metrics = {'activity_resumed': None, 'ready': None, 'samples': 0}
+        interval = self.min_interval
+        latest = stream.latest_frame()
+        last_seq = latest.seq if latest else 0
+        resume_seen = False
+        ready = False
+        try:
+            if launch is not None:
+                launch()
+
+            while time.monotonic() - start < timeout:
+                frame = stream.wait_for_frame(last_seq, timeout=self.max_interval)
+                if frame is not None:
+                    last_seq = frame.seq
+                    self.metrics['samples'] += 1
+                    ready_now = self.matches(frame.image) if own_stream else self.is_ready(frame.image)
+                    if ready_now:
+                        ready = True
+                        break
+
+                if on_sample is not None:
+                    on_sample()
+
+                # Reprise de l'activité: on revient à l'intervalle le plus court
+                if activity.resumed.is_set() and not resume_seen:
+                    resume_seen = True
+                    self.metrics['activity_resumed'] = activity.resumed_at - start
+                    interval = self.min_interval
+                else:
+                    interval = min(interval * self.backoff, self.max_interval)
+                stream.set_interval(interval)
+        finally:
+            activity.stop()
+            if own_stream:
+                stream.stop()
+            else:
+                stream.set_interval(previous_interval)
+
+        if ready:
+            self.metrics['ready'] = time.monotonic() - start
+        self.metrics['elapsed'] = time.monotonic() - start
+        return ready
+
+    def report(self):
+        """Résumé lisible des métriques du dernier chargement"""
+        resumed = self.metrics.get('activity_resumed')
+        ready = self.metrics.get('ready')
+        return (f"activité reprise: {f'{resumed:.2f}s' if resumed is not None else '-'} | "
+                f"prêt: {f'{ready:.2f}s' if ready is not None else '-'} | "
+                f"vérifications: {self.metrics.get('samples', 0)}")
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from core.touch_events import EV_SYN, SYN_REPORT, TouchEventReader, event_dtype
+
+# Un événement par ligne: instant relatif au début de la macro (microsecondes), puis
+# type/code/valeur de l'input_event Linux. 12 octets par événement.
+MACRO_DTYPE = np.dtype([("t", "<u4"), ("type", "<u2"), ("code", "<u2"), ("value", "<i4")])
+
+
+class Macro:
+    """Suite d'événements d'entrée horodatés, rejouable sur l'appareil en un aller-retour
+
+    La macro est compilée en script shell exécuté sur l'appareil: les
+    événements de chaque trame (jusqu'au SYN_REPORT) sont écrits dans
+    /dev/input/eventX et les attentes entre trames sont des `sleep` côté
+    appareil. Deux modes:
+      - "raw": les événements sont poussés tels quels (input_event) et
+        chaque groupe de trames est écrit par un seul `dd`;
+      - "sendevent": un `sendevent` par événement (plus lent: un processus
+        par événement, à réserver aux appareils sans dd).
+    """
+
+    def __init__(self, events, device, event_size=24):
+        self.events = np.asarray(events, dtype=MACRO_DTYPE)
+        self.device = device
+        self.event_size = event_size
+
+    @classmethod
+    def from_raw(cls, data, device, event_size=24):
+        """Macro depuis des input_event bruts (copie de /dev/input/eventX)"""
+        raw = np.frombuffer(data, dtype=event_dtype(event_size), count=len(data) // event_size)
+        syn = np.flatnonzero((raw["type"] == EV_SYN) & (raw["code"] == SYN_REPORT))
+        raw = raw[:syn[-1] + 1] if len(syn) else raw[:0]  # Trame incomplète en fin d'enregistrement ignorée
+        events = np.empty(len(raw), dtype=MACRO_DTYPE)
+        if len(raw):
+            t = raw["sec"].astype(np.int64) * 1000000 + raw["usec"]
+            events["t"] = t - t[0]
+        events["type"], events["code"], events["value"] = raw["type"], raw["code"], raw["value"]
+        return cls(events, device, event_size)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["events"], str(data["device"]), int(data["event_size"]))
+
+    def save(self, path):
+        """Enregistre la macro (.npz compressé)"""
+        np.savez_compressed(path, events=self.events, device=np.array(self.device),
+                            event_size=np.array(self.event_size))
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def duration(self):
+        return float(self.events["t"][-1]) / 1e6 if len(self.events) else 0.0
+
+    def frame_ends(self):
+        """Indice (exclu) de fin de chaque trame"""
+        return np.flatnonzero((self.events["type"] == EV_SYN) & (self.events["code"] == SYN_REPORT)) + 1
+
+    def to_raw(self):
+        """input_event à écrire sur l'appareil (l'horodatage est fixé par le noyau)"""
+        raw = np.zeros(len(self.events), dtype=event_dtype(self.event_size))
+        raw["type"], raw["code"], raw["value"] = self.events["type"], self.events["code"], self.events["value"]
+        return raw.tobytes()
+
+    def compile(self, mode="raw", data_path=None, overhead=0.0, min_sleep=0.001):
+        """Script shell de rejeu
+
+        overhead: durée estimée (secondes) d'une commande d'écriture sur
+        l'appareil, déduite des attentes suivantes. Les attentes plus
+        courtes que min_sleep sont reportées sur la suivante.
+        """
+        if mode not in ("raw", "sendevent"):
+            raise ValueError(f"Mode de rejeu inconnu: {mode}")
+        lines = [f"D={self.device}"]
+        if mode == "raw":
+            lines.append(f"F={data_path}")
+        times = self.events["t"] / 1e6
+        clock = 0.0  # Temps écoulé estimé sur l'appareil
+        pending = 0  # Premier événement pas encore écrit (mode raw)
+        start = 0
+        for end in self.frame_ends():
+            wait = times[end - 1] - clock
+            if wait >= min_sleep:
+                if mode == "raw" and pending < start:
+                    lines.append(self._dd(pending, start))
+                    pending = start
+                lines.append(f"sleep {wait:.6f}")
+                clock = times[end - 1]
+            if mode == "sendevent":
+                lines.extend(f"sendevent $D {event['type']} {event['code']} {event['value']}"
+                             for event in self.events[start:end])
+                clock += overhead * (end - start)
+            else:
+                clock += overhead
+            start = end
+        if mode == "raw" and pending < start:
+            lines.append(self._dd(pending, start))
+        return "\n".join(lines) + "\n"
+
+    def _dd(self, start, end):
+        return f"dd if=$F of=$D bs={self.event_size} skip={start} count={end - start} 2>/dev/null || exit 1"
+
+    def play(self, phone, mode="raw", remote_dir="/data/local/tmp", overhead=0.0, timeout=None):
+        """Pousse la macro et l'exécute sur l'appareil; retourne True si le rejeu a réussi"""
+        if not len(self.events):
+            return True
+        data = self.to_raw()
+        name = "macro_" + hashlib.sha1(data).hexdigest()[:12]
+        data_path = f"{remote_dir}/{name}.bin"
+        script_path = f"{remote_dir}/{name}.sh"
+        script = self.compile(mode, data_path, overhead)
+        try:
+            if mode == "raw":
+                _push(phone, data, data_path)
+            _push(phone, script.encode(), script_path, 0o755)
+            result = phone.shell.run(f"sh {script_path}", timeout=timeout or self.duration + 10)
+        except Exception as e:
+            print(f"Échec rejeu de la macro: {str(e)}")
+            return False
+        if result.returncode != 0:
+            print(f"Échec rejeu de la macro (code {result.returncode}): {result.output.strip()}")
+            return False
+        return True
+
+
+def _push(phone, data, remote_path, mode=0o644):
+    client = getattr(phone, "client", None)
+    if client is not None:
+        client.push(data, remote_path, mode)
+        return
+    fd, local_path = tempfile.mkstemp(prefix="macro_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        subprocess.run(phone.adb_prefix + ["push", local_path, remote_path],
+                       capture_output=True, check=True, timeout=30)
+    finally:
+        os.remove(local_path)
+
+
+class MacroRecorder(TouchEventReader):
+    """Enregistre les événements bruts de l'écran tactile (en plus des contacts décodés)"""
+
+    def __init__(self, phone, device=None, event_size=None, max_slots=10):
+        super().__init__(phone, device=device, event_size=event_size, max_slots=max_slots)
+        self._raw = bytearray()
+
+    def _handle(self, data):
+        self._raw += data
+        super()._handle(data)
+
+    def macro(self):
+        return Macro.from_raw(bytes(self._raw), self.device, self.decoder.dtype.itemsize)
+
+
+def record(phone, duration, device=None):
+    """Enregistre duration secondes de gestes sur l'appareil, retourne la Macro"""
+    with MacroRecorder(phone, device=device) as recorder:
+        time.sleep(duration)
+    return recorder.macro()
@@ -0,0 +1,159 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Taille du pool partagé: variable d'environnement MATCH_WORKERS, sinon nombre de cœurs
+_pool_size = int(os.environ.get("MATCH_WORKERS", 0)) or os.cpu_count() or 1
+_executor = None
+_executor_lock = threading.Lock()
+_active_batches = 0  # Lots en cours sur le pool
+_saved_opencv_threads = None
+_opencv_lock = threading.Lock()
+
+
+def _enter_pool():
+    """OpenCV sur un seul thread tant qu'un lot tourne sur le pool
+
+    cv2.setNumThreads est global au processus: sans cela, les threads
+    internes d'OpenCV s'ajoutent à ceux du pool et se disputent les cœurs.
+    Le réglage d'origine est rétabli à la fin du dernier lot en cours; les
+    correspondances lancées ailleurs pendant un lot sont aussi limitées à
+    un thread.
+    """
+    global _active_batches, _saved_opencv_threads
+    with _opencv_lock:
+        if _active_batches == 0:
+            _saved_opencv_threads = cv2.getNumThreads()
+            cv2.setNumThreads(1)
+        _active_batches += 1
+
+
+def _leave_pool():
+    global _active_batches
+    with _opencv_lock:
+        _active_batches -= 1
+        if _active_batches == 0:
+            cv2.setNumThreads(_saved_opencv_threads)
+
+
+def get_pool_size():
+    return _pool_size
+
+
+def set_pool_size(workers):
+    """Change la taille du pool partagé (None ou 0 = nombre de cœurs)
+
+    Le pool est remplacé sous le verrou: les lots déjà soumis se terminent
+    sur l'ancien, les suivants prennent le nouveau.
+    """
+    global _pool_size, _executor
+    with _executor_lock:
+        _pool_size = workers or os.cpu_count() or 1
+        executor, _executor = _executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def _current_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_pool_size, thread_name_prefix="match")
+    return _executor
+
+
+def get_executor():
+    """Pool de threads partagé par tous les détecteurs
+
+    cv2.matchTemplate libère le GIL: plusieurs correspondances peuvent donc
+    tourner réellement en parallèle sur des threads Python.
+    """
+    with _executor_lock:
+        return _current_executor()
+
+
+def parallel_map(function, items):
+    """Applique function à chaque élément sur le pool partagé, résultats dans l'ordre"""
+    items = list(items)
+    if _pool_size <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    _enter_pool()
+    try:
+        # Soumission sous le verrou: set_pool_size ne peut pas fermer le pool entre-temps
+        with _executor_lock:
+            executor = _current_executor()
+            futures = [executor.submit(function, item) for item in items]
+        return [future.result() for future in futures]
+    finally:
+        _leave_pool()
+
+
+def _full_match(search_area, template, mask=None):
+    res = cv2.matchTemplate(search_area, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+    if mask is not None:
+        # Avec un masque, les zones uniformes donnent des valeurs infinies/NaN
+        res = np.nan_to_num(res, nan=-1.0, posinf=-1.0, neginf=-1.0)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return max_val, max_loc
+
+
+def _top_candidates(res, count, suppress_shape):
+    """Extrait les count meilleurs maxima en masquant le voisinage de chacun"""
+    res = res.copy()
+    sh, sw = suppress_shape
+    candidates = []
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(res)
+        if candidates and max_val < candidates[0][0] - 0.15:
+            break  # Candidats trop faibles par rapport au meilleur
+        candidates.append((max_val, (x, y)))
+        res[max(y - sh, 0):y + sh + 1, max(x - sw, 0):x + sw + 1] = -1.0
+    return candidates
+
+
+def match_template(gray, template, mask=None, threshold=0.8, levels=1, candidates=3,
+                   min_template_size=12, refine_margin=3):
+    """Correspondance grossière puis fine (pyramide) en TM_CCOEFF_NORMED
+
+    La recherche complète se fait sur l'image réduite de 2**levels, puis les
+    meilleurs candidats sont affinés à pleine résolution dans un petit
+    voisinage. Si le template devient trop petit une fois réduit, ou si la
+    zone de recherche est à peine plus grande que lui, on revient à la
+    correspondance pleine résolution. Retourne le même dictionnaire
+    detected/confidence/location que detect_view.
+    """
+    th, tw = template.shape[:2]
+    gh, gw = gray.shape[:2]
+    scale = 0.5 ** levels
+    small_tw, small_th = int(tw * scale), int(th * scale)
+
+    too_small = min(small_tw, small_th) < min_template_size
+    tight_area = (gw - tw + 1) * (gh - th + 1) <= 4 * tw * th
+    if levels <= 0 or too_small or tight_area:
+        max_val, max_loc = _full_match(gray, template, mask)
+        return {'detected': max_val >= threshold, 'confidence': float(max_val), 'location': max_loc}
+
+    small_gray = cv2.resize(gray, (int(gw * scale), int(gh * scale)), interpolation=cv2.INTER_AREA)
+    small_tpl = cv2.resize(template, (small_tw, small_th), interpolation=cv2.INTER_AREA)
+    small_mask = None
+    if mask is not None:
+        small_mask = cv2.resize(mask, (small_tw, small_th), interpolation=cv2.INTER_NEAREST)
+
+    res = cv2.matchTemplate(small_gray, small_tpl, cv2.TM_CCOEFF_NORMED, mask=small_mask)
+    if small_mask is not None:
+        res = np.nan_to_num(res, nan=-1.0, posinf=-1.0, neginf=-1.0)
+
+    # Affinage à pleine résolution autour de chaque candidat
+    pad = int(round(1 / scale)) + refine_margin
+    best_val, best_loc = -1.0, (0, 0)
+    for _, (x, y) in _top_candidates(res, candidates, (small_th // 2, small_tw // 2)):
+        fx, fy = int(x / scale), int(y / scale)
+        x1, y1 = max(fx - pad, 0), max(fy - pad, 0)
+        x2, y2 = min(fx + tw + pad, gw), min(fy + th + pad, gh)
+        max_val, (lx, ly) = _full_match(gray[y1:y2, x1:x2], template, mask)
+        if max_val > best_val:
+            best_val, best_loc = max_val, (lx + x1, ly + y1)
+
+    return {'detected': best_val >= threshold, 'confidence': float(best_val), 'location': best_loc}
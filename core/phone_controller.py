@@ -1,19 +1,74 @@
 import subprocess
-import re
+import shutil
 import cv2
 import numpy as np
 import os
+import time
+import struct
+import threading
+from core.adb_client import AdbClient
+from core.adb_session import AdbShellSession
+from core.input_batch import InputBatch
+from core.tracing import span
+from core.device_profile import (ORIENTATION_COMMAND, PROFILE_CACHE, load_device_profile,
+                                 parse_density, parse_orientation, parse_resolution)
+
+# Formats de pixels renvoyés par `screencap` sans -p (PixelFormat Android)
+RAW_PIXEL_FORMATS = {1: "RGBA", 2: "RGBX", 5: "BGRA"}
+RAW_TO_BGR = {
+    "RGBA": cv2.COLOR_RGBA2BGR,
+    "RGBX": cv2.COLOR_RGBA2BGR,
+    "BGRA": cv2.COLOR_BGRA2BGR,
+}
+
+
+def parse_raw_screencap(data):
+    """Interprète la sortie brute de `screencap` sans copier les pixels
+
+    L'en-tête contient largeur, hauteur et format (12 octets), suivis d'un
+    espace colorimétrique sur les Android récents (16 octets). Retourne
+    (image, format) où image est une vue numpy HxWx4 en lecture seule sur data.
+    """
+    if len(data) < 12:
+        raise ValueError("Capture brute tronquée")
+    width, height, pixel_format = struct.unpack_from("<3I", data, 0)
+    frame_size = width * height * 4
+    header_size = len(data) - frame_size
+    if header_size not in (12, 16):
+        raise ValueError(f"Taille de capture brute inattendue ({len(data)} octets pour {width}x{height})")
+    if pixel_format not in RAW_PIXEL_FORMATS:
+        raise ValueError(f"Format de pixel non supporté: {pixel_format}")
+    image = np.frombuffer(data, dtype=np.uint8, count=frame_size, offset=header_size)
+    return image.reshape(height, width, 4), RAW_PIXEL_FORMATS[pixel_format]
+
 
 class PhoneController:
     """Classe pour contrôler un appareil Android via ADB"""
     
-    def __init__(self, device_id=None):
+    def __init__(self, device_id=None, capture_mode="raw", backend="socket", profile_cache=PROFILE_CACHE):
+        self.device_id = device_id
+        self.capture_mode = capture_mode  # "raw" (framebuffer brut) ou "png"
         self.adb_prefix = ["adb"] if not device_id else ["adb", "-s", device_id]
-        self._check_adb_installation()
-        self.check_connection()
-        self.resolution = self.get_screen_resolution()
-        self.density = self.get_screen_density()
-        self.orientation = self.get_screen_orientation()
+        # "socket": protocole ADB direct (TCP 5037), "cli": binaire adb
+        self.client = self._open_client() if backend == "socket" else None
+        self.backend = "socket" if self.client is not None else "cli"
+        if self.client is None:
+            self._check_adb_installation()
+        self.shell = AdbShellSession(self.adb_prefix, client=self.client)
+        self._raw_buffer = None  # Tampon réutilisé pour la capture brute (mode socket)
+        self._capture_lock = threading.Lock()
+        # Profil en cache (partagé dans le processus et sur disque): un seul aller-retour
+        # profile_cache: fichier du cache disque (None: cache mémoire seulement)
+        try:
+            self.profile = load_device_profile(self.shell, self.device_id or self._adb_serial,
+                                               cache_path=profile_cache)
+        except Exception as e:
+            raise RuntimeError(f"Échec vérification connexion: {str(e)}")
+        print(f"Appareil connecté: {self.profile['model']}")
+        self.serial = self.profile['serial']
+        self.resolution = tuple(self.profile['resolution'])
+        self.density = self.profile['density']
+        self.orientation = self.profile['orientation']
         self.setup_touch_parameters()
 
     def check_connection(self):
@@ -34,46 +89,66 @@ class PhoneController:
     def run_adb_command(self, command):
         """Exécute une commande ADB et retourne le résultat"""
         try:
-            result = subprocess.run(
-                self.adb_prefix + ["shell", command],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=10
-            )
-            return result.stdout.strip()
+            return self.shell.run(command).output.strip()
         except Exception as e:
             print(f"Échec commande ADB: {str(e)}")
             return ""
 
-    def _check_adb_installation(self):
-        """Vérifie si ADB est installé et accessible"""
+    def run_adb_batch(self, commands):
+        """Exécute plusieurs commandes en un seul aller-retour ADB"""
         try:
-            subprocess.run(
-                ["adb", "--version"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-        except (subprocess.CalledProcessError, FileNotFoundError):
+            return [result.output.strip() for result in self.shell.run_batch(commands)]
+        except Exception as e:
+            print(f"Échec commandes ADB: {str(e)}")
+            return [""] * len(commands)
+
+    def _shell(self, command, timeout=None):
+        """Exécute une commande via la session persistante, lève une erreur si elle échoue"""
+        result = self.shell.run(command, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(result.output.strip())
+        return result.output
+
+    def _adb_serial(self):
+        """Numéro de série vu par le serveur adb (None s'il est inconnu)"""
+        try:
+            if self.client is not None:
+                serial = self.client.get_serialno()
+            else:
+                serial = subprocess.run(self.adb_prefix + ["get-serialno"], capture_output=True,
+                                        text=True, timeout=5).stdout.strip()
+        except Exception as e:
+            print(f"Numéro de série adb indisponible: {str(e)}")
+            return None
+        return serial if serial and serial != "unknown" else None
+
+    def _open_client(self):
+        """Client ADB direct, ou None s'il faut repasser par le binaire adb"""
+        client = AdbClient(self.device_id)
+        try:
+            if "shell_v2" in client.features():
+                return client
+            print("Protocole shell v2 non supporté - Utilisation du binaire adb")
+        except Exception as e:
+            print(f"Serveur ADB injoignable en direct ({str(e)}) - Utilisation du binaire adb")
+        client.close()
+        return None
+
+    def _check_adb_installation(self):
+        """Vérifie si ADB est installé et accessible (sans lancer de processus)"""
+        if shutil.which("adb") is None:
             raise RuntimeError("ADB n'est pas installé ou n'est pas dans le PATH")
 
     def check_connection(self):
         """Vérification améliorée de la connexion"""
         try:
             # Commande plus fiable
-            result = subprocess.run(
-                self.adb_prefix + ["shell", "getprop", "ro.product.model"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=5
-            )
+            result = self.shell.run("getprop ro.product.model", timeout=5)
             
             if result.returncode != 0:
-                raise RuntimeError(f"Erreur ADB: {result.stderr.strip()}")
+                raise RuntimeError(f"Erreur ADB: {result.output.strip()}")
                 
-            print(f"Appareil connecté: {result.stdout.strip()}")
+            print(f"Appareil connecté: {result.output.strip()}")
             return True
         except Exception as e:
             print(f"Échec vérification connexion: {str(e)}")
@@ -82,55 +157,26 @@ class PhoneController:
     def get_screen_resolution(self):
         """Récupère la résolution de l'écran"""
         try:
-            result = subprocess.run(
-                self.adb_prefix + ["shell", "wm", "size"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True
-            )
-            match = re.search(r"(\d+)x(\d+)", result.stdout)
-            if match:
-                return (int(match.group(1)), int(match.group(2)))
-            raise RuntimeError("Impossible de parser la résolution")
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Erreur lors de la récupération de la résolution: {e.stderr}")
+            output = self._shell("wm size")
+        except RuntimeError as e:
+            raise RuntimeError(f"Erreur lors de la récupération de la résolution: {e}")
+        return parse_resolution(output)
 
     def get_screen_density(self):
         """Récupère la densité de l'écran"""
         try:
-            result = subprocess.run(
-                self.adb_prefix + ["shell", "wm", "density"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True
-            )
-            match = re.search(r"(\d+)", result.stdout)
-            if match:
-                return int(match.group(1))
-            raise RuntimeError("Impossible de parser la densité")
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Erreur lors de la récupération de la densité: {e.stderr}")
+            output = self._shell("wm density")
+        except RuntimeError as e:
+            raise RuntimeError(f"Erreur lors de la récupération de la densité: {e}")
+        return parse_density(output)
 
     def get_screen_orientation(self):
         """Récupère l'orientation de l'écran"""
-        try:
-            result = subprocess.run(
-                self.adb_prefix + ["shell", "dumpsys", "input"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True
-            )
-            if "SurfaceOrientation: 0" in result.stdout:
-                return 0  # Portrait
-            elif "SurfaceOrientation: 1" in result.stdout:
-                return 1  # Paysage
-            else:
-                return 0  # Par défaut portrait
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Erreur lors de la récupération de l'orientation: {e.stderr}")
+        # Le filtrage côté appareil évite de rapatrier tout le dumpsys
+        result = self.shell.run(ORIENTATION_COMMAND)
+        if result.returncode > 1:  # grep renvoie 1 quand rien ne correspond
+            raise RuntimeError(f"Erreur lors de la récupération de l'orientation: {result.output.strip()}")
+        return parse_orientation(result.output)
 
     def setup_touch_parameters(self):
         """Configure les paramètres de toucher en fonction de la densité"""
@@ -146,30 +192,91 @@ class PhoneController:
     def calibrate(self):
         """Calibration de base"""
         print("Calibration en cours...")
-        sleep(1)  # Simulation de calibration
+        time.sleep(1)  # Simulation de calibration
+
+    def tap(self, x, y):
+        """Tape à la position (x, y) via la session persistante"""
+        with span("input"):
+            return self.run_adb_command(f"input tap {int(x)} {int(y)}")
+
+    def swipe(self, x1, y1, x2, y2, duration_ms=300):
+        """Glisse de (x1, y1) vers (x2, y2)"""
+        with span("input"):
+            return self.run_adb_command(
+                f"input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration_ms)}")
 
-    def capture_screen(self, filename="screen.png"):
-        """Capture améliorée avec vérification"""
+    def batch(self):
+        """Nouveau lot d'entrées exécuté en un seul aller-retour (voir InputBatch)"""
+        return InputBatch(self)
+
+    def _exec_out(self, command, timeout=10):
+        """Exécute une commande via exec-out et retourne la sortie binaire"""
+        if self.client is not None:
+            return self.client.exec_out(command, timeout=timeout)
+        result = subprocess.run(
+            self.adb_prefix + ["exec-out", command],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+            timeout=timeout
+        )
+        return result.stdout
+
+    def _capture_raw_view(self, timeout=10):
+        if self.client is None:
+            with span("capture"):
+                data = self._exec_out("screencap", timeout)
+            return parse_raw_screencap(data)
+        # Lecture directe dans le tampon réutilisé: aucune copie des pixels
+        with span("capture"):
+            self._raw_buffer, size = self.client.exec_out_into("screencap", self._raw_buffer, timeout)
+        return parse_raw_screencap(memoryview(self._raw_buffer)[:size])
+
+    def capture_raw(self):
+        """Capture le framebuffer brut sans compression PNG
+
+        Retourne (image, format): image est une vue HxWx4 sans copie sur les
+        octets reçus, format vaut "RGBA", "RGBX" ou "BGRA". En mode socket,
+        la vue pointe sur un tampon réutilisé: elle n'est valable que
+        jusqu'à la capture suivante (la copier pour la garder).
+        """
         try:
-            # Nouvelle méthode plus fiable
-            result = subprocess.run(
-                self.adb_prefix + ["exec-out", "screencap -p"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True,
-                timeout=10
-            )
-            
-            img_array = np.frombuffer(result.stdout, dtype=np.uint8)
-            img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+            with self._capture_lock:
+                return self._capture_raw_view()
+        except (subprocess.TimeoutExpired, TimeoutError):
+            print("Timeout capture - Redémarrage ADB...")
+            self.restart_adb()
+        except Exception as e:
+            print(f"Erreur capture: {str(e)}")
+        return None, None
+
+    def capture_screen(self, filename=None, mode=None):
+        """Capture l'écran et retourne une image BGR
+
+        mode: "raw" ou "png" (par défaut self.capture_mode).
+        L'écriture sur disque n'a lieu que si filename est fourni.
+        """
+        mode = mode or self.capture_mode
+        try:
+            if mode == "png":
+                with span("capture"):
+                    img_array = np.frombuffer(self._exec_out("screencap -p"), dtype=np.uint8)
+                with span("decode"):
+                    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+            else:
+                with self._capture_lock:
+                    rgba, pixel_format = self._capture_raw_view()
+                    with span("decode"):
+                        img = cv2.cvtColor(rgba, RAW_TO_BGR[pixel_format])
             
             if img is None:
                 raise ValueError("Données d'image corrompues")
             
-            cv2.imwrite(filename, img)
+            if filename:
+                cv2.imwrite(filename, img)
             return img
             
-        except subprocess.TimeoutExpired:
+        except (subprocess.TimeoutExpired, TimeoutError):
             print("Timeout capture - Redémarrage ADB...")
             self.restart_adb()
             return None
@@ -179,10 +286,21 @@ class PhoneController:
 
     def restart_adb(self):
         """Redémarre le serveur ADB"""
+        self.shell.close()  # La session sera rouverte à la prochaine commande
+        if self.client is not None:
+            # Le serveur est partagé entre appareils: on repart seulement de connexions neuves
+            self.client.reset()
+            return
         subprocess.run(["adb", "kill-server"])
         subprocess.run(["adb", "start-server"])
         time.sleep(2)
         
+    def close(self):
+        """Ferme la session ADB persistante"""
+        self.shell.close()
+        if self.client is not None:
+            self.client.close()
+
     def capture_and_show(self, scale_factor=0.5):
         """Capture et affiche l'écran avec redimensionnement"""
         try:
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+from core.matching import parallel_map
+from core.template_bank import TemplateBank
+
+RESOURCE_KINDS = ("food", "wood", "stone", "gold", "gems", "barbarian")
+
+# Une détection: type (indice dans kinds), centre (x, y) et score de correspondance
+DETECTION_DTYPE = np.dtype([("kind", np.uint8), ("x", np.int32), ("y", np.int32), ("score", np.float32)])
+
+
+def non_max_suppression(boxes, scores, overlap=0.3):
+    """NMS glouton vectorisé, retourne les indices conservés (score décroissant)
+
+    boxes: tableau (N, 4) de x1, y1, x2, y2.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+    x1, y1, x2, y2 = boxes.T.astype(np.float32)
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(scores)[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= overlap]
+    return np.array(keep, dtype=np.intp)
+
+
+class ResourceDetector:
+    """Détecte toutes les occurrences des ressources et barbares sur la carte
+
+    L'image est convertie en niveaux de gris une seule fois, puis chaque
+    template est recherché en parallèle sur le pool partagé de core.matching.
+    Tous les pics au-dessus du seuil sont extraits (pas seulement le
+    meilleur), puis une suppression des non-maxima est faite entre tous les
+    types pour ne garder qu'une détection par objet.
+    """
+
+    def __init__(self, bank=None, kinds=RESOURCE_KINDS, threshold=0.8, overlap=0.3,
+                 max_per_kind=200):
+        self.bank = bank if bank is not None else TemplateBank()
+        self.kinds = tuple(kind for kind in kinds if kind in self.bank)
+        self.threshold = threshold
+        self.overlap = overlap
+        self.max_per_kind = max_per_kind
+
+    def kind_name(self, kind):
+        return self.kinds[kind]
+
+    def _peaks(self, gray, kind_index):
+        """Tous les maxima locaux au-dessus du seuil pour un template"""
+        template = self.bank.get(self.kinds[kind_index])
+        th, tw = template.gray.shape
+        if gray.shape[0] < th or gray.shape[1] < tw:
+            return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32), kind_index
+
+        res = cv2.matchTemplate(gray, template.gray, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+        if template.mask is not None:
+            res = np.nan_to_num(res, nan=-1.0, posinf=-1.0, neginf=-1.0)
+
+        # Maximum local: la valeur est égale au maximum de son voisinage
+        kernel = np.ones((max(th // 2, 3), max(tw // 2, 3)), np.uint8)
+        local_max = cv2.dilate(res, kernel)
+        ys, xs = np.nonzero((res >= self.threshold) & (res >= local_max))
+        scores = res[ys, xs]
+
+        if len(scores) > self.max_per_kind:
+            best = np.argpartition(scores, -self.max_per_kind)[-self.max_per_kind:]
+            ys, xs, scores = ys[best], xs[best], scores[best]
+
+        boxes = np.stack([xs, ys, xs + tw, ys + th], axis=1).astype(np.int32)
+        return boxes, scores.astype(np.float32), kind_index
+
+    def detect(self, image):
+        """Retourne un tableau structuré DETECTION_DTYPE trié par score décroissant"""
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        results = parallel_map(lambda k: self._peaks(gray, k), range(len(self.kinds)))
+
+        boxes = np.concatenate([r[0] for r in results]) if results else np.empty((0, 4), np.int32)
+        scores = np.concatenate([r[1] for r in results]) if results else np.empty(0, np.float32)
+        kinds = np.concatenate([np.full(len(r[1]), r[2], dtype=np.uint8) for r in results]) \
+            if results else np.empty(0, np.uint8)
+
+        keep = non_max_suppression(boxes, scores, self.overlap)
+        detections = np.empty(len(keep), dtype=DETECTION_DTYPE)
+        detections["kind"] = kinds[keep]
+        detections["x"] = (boxes[keep, 0] + boxes[keep, 2]) // 2
+        detections["y"] = (boxes[keep, 1] + boxes[keep, 3]) // 2
+        detections["score"] = scores[keep]
+        return detections
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+from collections import deque
+
+from core.template_bank import TEMPLATES_DIR
+
+ROI_CONFIG = os.path.join(TEMPLATES_DIR, "rois.json")
+LEARNED_ROIS = os.path.join(TEMPLATES_DIR, "rois_learned.json")
+
+
+class RoiRegistry:
+    """Zones de recherche (ROI) par template, indépendantes de la résolution
+
+    Les ROI sont exprimées en fractions de la largeur/hauteur de l'écran
+    (x1, y1, x2, y2). Elles viennent du fichier de configuration, ou sont
+    apprises à partir des positions où le template a été trouvé avec une
+    confiance d'au moins min_confidence (union des history dernières boîtes
+    + marge: une position ancienne ou aberrante finit par sortir de la
+    ROI). Un template sans ROI connue est cherché sur toute l'image.
+    """
+
+    def __init__(self, config_path=ROI_CONFIG, learned_path=LEARNED_ROIS,
+                 min_samples=5, save_every=50, learn=True, min_confidence=0.9, history=50):
+        self.config_path = config_path
+        self.learned_path = learned_path
+        self.min_samples = min_samples  # Détections nécessaires avant d'utiliser une ROI apprise
+        self.save_every = save_every
+        self.learn = learn  # False: n'utilise que les ROI configurées/déjà apprises
+        self.min_confidence = min_confidence  # Confiance minimale d'une détection pour apprendre
+        self.history = history  # Nombre de dernières détections dont la ROI est l'union
+        self.margin = 0.01
+        self.rois = {}
+        self.learned = {}  # {nom: [x1, y1, x2, y2, nb_observations]}
+        self._hits = {}  # {nom: dernières boîtes observées}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Charge la configuration et les ROI apprises"""
+        config = self._read_json(self.config_path)
+        self.margin = config.get("margin", self.margin)
+        self.rois = {name: tuple(box) for name, box in config.get("rois", {}).items()}
+        self.learned = self._read_json(self.learned_path)
+        # La ROI enregistrée compte comme une boîte: elle sort de l'union après history détections
+        self._hits = {name: deque([learned[:4]], maxlen=self.history) for name, learned in self.learned.items()}
+
+    @staticmethod
+    def _read_json(path):
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Fichier ROI illisible {path}: {str(e)}")
+            return {}
+
+    def save(self):
+        """Enregistre les ROI apprises sur disque"""
+        if not self.learned_path:
+            return
+        with self._lock:
+            data = json.dumps(self.learned, indent=2)
+            self._pending = 0
+        with open(self.learned_path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+    def normalized_roi(self, name):
+        """ROI normalisée du template (configurée, sinon apprise), ou None"""
+        if name in self.rois:
+            return self.rois[name]
+        learned = self.learned.get(name)
+        if learned and learned[4] >= self.min_samples:
+            x1, y1, x2, y2 = learned[:4]
+            m = self.margin
+            return (max(x1 - m, 0.0), max(y1 - m, 0.0), min(x2 + m, 1.0), min(y2 + m, 1.0))
+        return None
+
+    def roi(self, name, frame_shape, template_shape=None):
+        """ROI en pixels (x1, y1, x2, y2) pour une image de forme frame_shape
+
+        La zone est agrandie si besoin pour contenir au moins le template.
+        """
+        box = self.normalized_roi(name)
+        if box is None:
+            return None
+        height, width = frame_shape[:2]
+        x1, y1 = int(round(box[0] * width)), int(round(box[1] * height))
+        x2, y2 = int(round(box[2] * width)), int(round(box[3] * height))
+
+        if template_shape is not None:
+            th, tw = template_shape[:2]
+            x1, x2 = self._fit(x1, x2, tw, width)
+            y1, y2 = self._fit(y1, y2, th, height)
+        return x1, y1, x2, y2
+
+    @staticmethod
+    def _fit(start, end, size, limit):
+        """Élargit [start, end) autour de son centre pour couvrir au moins size pixels"""
+        if end - start >= size:
+            return max(start, 0), min(end, limit)
+        center = (start + end) // 2
+        start = min(max(center - size // 2, 0), max(limit - size, 0))
+        return start, min(start + size, limit)
+
+    def record(self, name, location, template_shape, frame_shape, confidence):
+        """Mémorise une détection pour apprendre la ROI d'un template non configuré"""
+        if not self.learn or name in self.rois or confidence < self.min_confidence:
+            return
+        height, width = frame_shape[:2]
+        th, tw = template_shape[:2]
+        x, y = location
+        box = [x / width, y / height, (x + tw) / width, (y + th) / height]
+
+        with self._lock:
+            hits = self._hits.get(name)
+            if hits is None:
+                hits = self._hits[name] = deque(maxlen=self.history)
+            hits.append(box)
+            count = self.learned[name][4] + 1 if name in self.learned else 1
+            self.learned[name] = [min(hit[0] for hit in hits), min(hit[1] for hit in hits),
+                                  max(hit[2] for hit in hits), max(hit[3] for hit in hits), count]
+            self._pending += 1
+            should_save = self.save_every and self._pending >= self.save_every
+
+        if should_save:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Impossible d'enregistrer les ROI apprises: {str(e)}")
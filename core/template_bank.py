@@ -0,0 +1,102 @@
+import glob
+import os
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "tests", "templates")
+
+# image: BGR, gray: niveaux de gris, mask: alpha binarisé (None si opaque)
+Template = namedtuple("Template", ["name", "path", "image", "gray", "mask", "mtime"])
+
+
+def load_template(name, path):
+    """Charge un template depuis le disque et précalcule ses variantes"""
+    raw = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if raw is None:
+        return None
+    if raw.ndim == 2:
+        raw = cv2.cvtColor(raw, cv2.COLOR_GRAY2BGR)
+
+    mask = None
+    if raw.shape[2] == 4:
+        alpha = raw[:, :, 3]
+        if np.any(alpha < 255):
+            mask = np.where(alpha > 0, 255, 0).astype(np.uint8)
+        raw = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR)
+
+    gray = cv2.cvtColor(raw, cv2.COLOR_BGR2GRAY)
+    return Template(name, path, raw, gray, mask, os.path.getmtime(path))
+
+
+class TemplateBank:
+    """Cache des templates: chargés une seule fois, rechargés si le fichier change
+
+    Tous les PNG du dossier sont chargés à la construction (nom = nom de
+    fichier sans extension). La date de modification n'est vérifiée qu'au
+    plus toutes les check_interval secondes pour ne pas solliciter le disque
+    à chaque image.
+    """
+
+    def __init__(self, directory=TEMPLATES_DIR, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._templates = {}
+        self._last_check = {}
+        self._lock = threading.Lock()
+        self.load_all()
+
+    def load_all(self):
+        """(Re)charge tous les PNG du dossier"""
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.png"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            self.add(name, path)
+
+    def add(self, name, path):
+        """Ajoute (ou remplace) un template à partir d'un fichier"""
+        template = load_template(name, path)
+        with self._lock:
+            if template is None:
+                print(f"Template illisible: {path}")
+                self._templates.pop(name, None)
+            else:
+                self._templates[name] = template
+            self._last_check[name] = time.monotonic()
+        return template
+
+    def names(self):
+        return list(self._templates)
+
+    def get(self, name, path=None):
+        """Retourne le Template `name`, rechargé seulement si son fichier a changé
+
+        Si le nom est inconnu et qu'un chemin est fourni, le fichier est chargé
+        et mis en cache.
+        """
+        now = time.monotonic()
+        # Appelé depuis les threads du pool de correspondance: lecture et mise à jour sous verrou
+        with self._lock:
+            template = self._templates.get(name)
+            if template is not None:
+                if now - self._last_check.get(name, 0) < self.check_interval:
+                    return template
+                self._last_check[name] = now
+        if template is None:
+            return self.add(name, path) if path else None
+        try:
+            mtime = os.path.getmtime(template.path)
+        except OSError:
+            return template  # Fichier supprimé: on garde la version en mémoire
+        if mtime != template.mtime:
+            return self.add(name, template.path) or template
+        return template
+
+    def __contains__(self, name):
+        return name in self._templates
+
+    def __len__(self):
+        return len(self._templates)
@@ -0,0 +1,166 @@
+import os
+
+import cv2
+import numpy as np
+
+from core.matching import match_template, parallel_map
+from core.roi_registry import RoiRegistry
+from core.template_bank import TemplateBank
+from core.tracing import span
+
+LOWER_VIOLET = np.array([130, 50, 50])
+UPPER_VIOLET = np.array([160, 255, 255])
+
+# Templates qui distinguent les vues du jeu (voir determine_final_view), pris dans le TemplateBank
+VIEW_TEMPLATES = {
+    'goto_city': {'check_violet': False},
+    'goto_map': {'check_violet': False},
+    'explore_marker': {'check_violet': True},
+    'mail_button': {'check_violet': False},
+}
+
+
+class TemplateDetector:
+    """Détecteur de vues par correspondance de templates
+
+    Les templates sont pris dans un TemplateBank (chargés et convertis une
+    seule fois): chaque appel à detect() ne fait que la correspondance, et
+    uniquement dans la zone de recherche donnée par le RoiRegistry, avec une
+    recherche grossière-fine sur pyramid_levels niveaux (0 = pleine résolution).
+
+    Avec un ChangeDetector, seuls les templates dont la zone de recherche a
+    changé depuis l'image précédente sont recalculés; les autres reprennent
+    le résultat précédent. L'attribut changed indique si un résultat a été
+    recalculé lors du dernier appel.
+    """
+
+    def __init__(self, templates, bank=None, threshold=0.8, violet_threshold=0.7, rois=None,
+                 pyramid_levels=1, change_detector=None):
+        self.templates = templates  # {nom: {'path': ..., 'check_violet': bool}}
+        self.bank = bank if bank is not None else TemplateBank()
+        self.rois = rois if rois is not None else RoiRegistry()
+        self.threshold = threshold
+        self.violet_threshold = violet_threshold
+        self.pyramid_levels = pyramid_levels
+        self.change_detector = change_detector
+        self.changed = True
+        self._last_results = {}
+
+    def _template(self, view_name, template_info):
+        path = template_info.get('path')
+        name = os.path.splitext(os.path.basename(path))[0] if path else view_name
+        return self.bank.get(name, path)
+
+    def detect(self, image, gray_image=None):
+        """Analyse une image BGR et retourne le dictionnaire de résultats par template
+
+        Chaque template est traité sur le pool de threads partagé
+        (core.matching.set_pool_size pour régler le nombre de threads).
+        """
+        if gray_image is None:
+            with span("grayscale"):
+                gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        changed_blocks = self.change_detector.update(gray_image) if self.change_detector else None
+
+        matches = parallel_map(
+            lambda item: self._detect_one(item[0], item[1], image, gray_image, changed_blocks),
+            self.templates.items())
+
+        results = {}
+        self.changed = False
+        for view_name, result, recomputed in matches:
+            if result is not None:
+                results[view_name] = result
+            self.changed = self.changed or recomputed
+        self._last_results = results
+        return results
+
+    def _detect_one(self, view_name, template_info, image, gray_image, changed_blocks=None):
+        """Correspondance d'un seul template, retourne (nom, résultat ou None, recalculé)"""
+        template = self._template(view_name, template_info)
+        if template is None:
+            return view_name, None, False
+
+        roi = self.rois.roi(view_name, gray_image.shape, template.gray.shape)
+        cached = self._last_results.get(view_name)
+        if (changed_blocks is not None and cached is not None
+                and not self.change_detector.region_changed(changed_blocks, roi, gray_image.shape)):
+            return view_name, cached, False
+
+        search_area = gray_image
+        search_offset = (0, 0)
+
+        # Limiter la zone analysée à la ROI du template quand elle est connue
+        if roi is not None:
+            x1, y1, x2, y2 = roi
+            search_area = gray_image[y1:y2, x1:x2]
+            search_offset = (x1, y1)
+
+        # Utilisation d'un seuil de confiance plus élevé pour éviter les faux positifs
+        with span("match", template=view_name):
+            match = match_template(search_area, template.gray, template.mask,
+                                   self.threshold, self.pyramid_levels)
+        max_val, max_loc = match['confidence'], match['location']
+        max_loc = (max_loc[0] + search_offset[0], max_loc[1] + search_offset[1])
+
+        check_violet = template_info.get('check_violet', False)
+        violet_percent = self.violet_percent(image, max_loc, template.gray.shape) if check_violet else 0
+
+        detected = max_val >= self.threshold
+        if check_violet:
+            detected = detected and (violet_percent >= self.violet_threshold)
+        if detected:
+            self.rois.record(view_name, max_loc, template.gray.shape, gray_image.shape, max_val)
+
+        return view_name, {
+            'detected': bool(detected),
+            'confidence': float(max_val),
+            'violet_percent': float(violet_percent),
+            'location': max_loc
+        }, True
+
+    @staticmethod
+    def violet_percent(image, location, shape):
+        """Proportion de pixels violets dans la zone (x, y) de taille shape (h, w)"""
+        x, y = location
+        h, w = shape[:2]
+        roi = image[y:y+h, x:x+w]
+        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, LOWER_VIOLET, UPPER_VIOLET)
+        return np.sum(mask > 0) / (w * h)
+
+
+# Fonction pour déterminer la vue
+def determine_final_view(detected):
+    if not detected['goto_city']['detected'] and detected['goto_map']['detected'] and not detected['explore_marker']['detected'] and not detected['mail_button']['detected']:
+        return "city_view"
+    elif detected['goto_city']['detected'] and not detected['goto_map']['detected'] and detected['explore_marker']['detected'] and not detected['mail_button']['detected']:
+        return "explore_view"
+    elif detected['goto_city']['detected'] and not detected['goto_map']['detected'] and not detected['explore_marker']['detected'] and not detected['mail_button']['detected']:
+        return "map_view"
+    elif detected['goto_city']['detected'] and not detected['goto_map']['detected'] and detected['explore_marker']['detected'] and detected['mail_button']['detected']:
+        return "kingdom_view"
+    else:
+        return "unknown"
+
+
+class TemplateViewDetector:
+    """Détection de la vue courante par templates (city_view, map_view, explore_view, kingdom_view)
+
+    Même interface que ViewDetector: detect_current_view retourne
+    (vue, confiance), 'inconnu' si aucune combinaison de templates ne
+    correspond. Le détecteur garde ses résultats d'une image à l'autre
+    (zones de recherche apprises, ChangeDetector éventuel).
+    """
+
+    def __init__(self, templates=VIEW_TEMPLATES, bank=None, rois=None, change_detector=None):
+        self.detector = TemplateDetector(templates, bank, rois=rois, change_detector=change_detector)
+
+    def detect_current_view(self, screenshot):
+        detected = self.detector.detect(screenshot)
+        if len(detected) < len(self.detector.templates):
+            return ('inconnu', 0)
+        view = determine_final_view(detected)
+        if view == "unknown":
+            return ('inconnu', 0)
+        return (view, min(result['confidence'] for result in detected.values() if result['detected']))
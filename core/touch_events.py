@@ -0,0 +1,274 @@
+import queue
+import re
+import socket
+import subprocess
+import threading
+
+import numpy as np
+
+# Types et codes d'événements Linux (linux/input-event-codes.h)
+EV_SYN, EV_KEY, EV_ABS = 0x00, 0x01, 0x03
+SYN_REPORT = 0x00
+ABS_MT_SLOT = 0x2f
+ABS_MT_POSITION_X = 0x35
+ABS_MT_POSITION_Y = 0x36
+ABS_MT_TRACKING_ID = 0x39
+
+# Un contact actif par ligne et par trame (SYN_REPORT). Une trame sans aucun
+# doigt posé donne une ligne slot = tracking_id = -1 (fin de geste).
+TOUCH_DTYPE = np.dtype([
+    ("frame", "<i8"),
+    ("t", "<f8"),
+    ("slot", "<i2"),
+    ("tracking_id", "<i4"),
+    ("x", "<i4"),
+    ("y", "<i4"),
+])
+
+
+def event_dtype(event_size=24):
+    """Structure input_event: timeval sur 2x8 octets (noyau 64 bits) ou 2x4 octets (32 bits)"""
+    word = {24: "<i8", 16: "<i4"}[event_size]
+    return np.dtype([("sec", word), ("usec", word), ("type", "<u2"), ("code", "<u2"), ("value", "<i4")])
+
+
+def _last_per_key(keys):
+    """Indices de la dernière occurrence de chaque clé (les événements sont dans l'ordre)"""
+    _, first_in_reversed = np.unique(keys[::-1], return_index=True)
+    return len(keys) - 1 - first_in_reversed
+
+
+class TouchDecoder:
+    """Décode des input_event bruts (protocole multitouch B) en trames de contacts
+
+    Le décodage est vectorisé sur tout un bloc: créneau courant propagé
+    vers l'avant, numéro de trame par somme cumulée des SYN_REPORT, puis
+    état (x, y, tracking id) de chaque créneau reporté de trame en trame.
+    Les octets qui suivent le dernier SYN_REPORT sont gardés pour le bloc
+    suivant.
+    """
+
+    FIELDS = (ABS_MT_POSITION_X, ABS_MT_POSITION_Y, ABS_MT_TRACKING_ID)
+
+    def __init__(self, event_size=24, max_slots=10):
+        self.dtype = event_dtype(event_size)
+        self.max_slots = max_slots
+        self._pending = bytearray()
+        self.slot = 0
+        # État par créneau: x, y, tracking id (-1: pas de doigt)
+        self.state = np.zeros((3, max_slots), dtype=np.int32)
+        self.state[2] = -1
+        self.frames = 0  # Nombre de trames émises
+
+    def feed(self, data):
+        """Ajoute des octets bruts, retourne les contacts des trames complètes (TOUCH_DTYPE)"""
+        self._pending += data
+        count = len(self._pending) // self.dtype.itemsize
+        events = np.frombuffer(self._pending, dtype=self.dtype, count=count)
+        syn = (events["type"] == EV_SYN) & (events["code"] == SYN_REPORT)
+        complete = np.flatnonzero(syn)
+        if not len(complete):
+            return np.empty(0, dtype=TOUCH_DTYPE)
+
+        size = int(complete[-1]) + 1
+        events, syn = events[:size], syn[:size]
+        code, value = events["code"].copy(), events["value"].copy()
+        is_abs = events["type"] == EV_ABS
+        frame_t = events["sec"][syn] + events["usec"][syn] * 1e-6
+        del events  # Libère la vue sur le tampon avant de le raccourcir
+        del self._pending[:size * self.dtype.itemsize]
+
+        # Créneau de chaque événement: dernier ABS_MT_SLOT vu, sinon celui du bloc précédent
+        positions = np.where(is_abs & (code == ABS_MT_SLOT), np.arange(size), -1)
+        np.maximum.accumulate(positions, out=positions)
+        slot = np.where(positions >= 0, value[np.maximum(positions, 0)], self.slot)
+        self.slot = int(slot[-1])
+
+        # Trame de chaque événement (celles d'avant le premier SYN_REPORT: trame 0)
+        frame = np.cumsum(syn) - syn
+        nframes = len(frame_t)
+        in_range = (slot >= 0) & (slot < self.max_slots)
+        frame_rows = np.arange(nframes + 1)[:, None]
+
+        grids = []
+        for axis, field in enumerate(self.FIELDS):
+            selected = np.flatnonzero(is_abs & (code == field) & in_range)
+            rows, slots = frame[selected] + 1, slot[selected]
+            keep = _last_per_key(rows * self.max_slots + slots)
+            grid = np.empty((nframes + 1, self.max_slots), dtype=np.int32)
+            grid[0] = self.state[axis]
+            grid[rows[keep], slots[keep]] = value[selected[keep]]
+            updated = np.zeros(grid.shape, dtype=bool)
+            updated[0] = True
+            updated[rows[keep], slots[keep]] = True
+            # Valeur reportée: dernière trame où le champ a été mis à jour
+            source = np.where(updated, frame_rows, 0)
+            np.maximum.accumulate(source, axis=0, out=source)
+            grid = np.take_along_axis(grid, source, axis=0)
+            self.state[axis] = grid[-1]
+            grids.append(grid[1:])
+        xs, ys, ids = grids
+
+        active = ids != -1
+        contact_frames, contact_slots = np.nonzero(active)
+        empty_frames = np.flatnonzero(~active.any(axis=1))
+        frames = np.concatenate([contact_frames, empty_frames])
+        order = np.argsort(frames, kind="stable")
+
+        contacts = np.empty(len(frames), dtype=TOUCH_DTYPE)
+        contacts["frame"] = self.frames + frames[order]
+        contacts["t"] = frame_t[frames[order]]
+        contacts["slot"] = np.concatenate([contact_slots, np.full(len(empty_frames), -1)])[order]
+        contacts["tracking_id"] = np.concatenate([ids[active], np.full(len(empty_frames), -1)])[order]
+        contacts["x"] = np.concatenate([xs[active], np.zeros(len(empty_frames), dtype=np.int32)])[order]
+        contacts["y"] = np.concatenate([ys[active], np.zeros(len(empty_frames), dtype=np.int32)])[order]
+        self.frames += nframes
+        return contacts
+
+
+def decode_file(path, event_size=24, max_slots=10, chunk_size=1 << 20):
+    """Décode un enregistrement brut (copie de /dev/input/eventX), retourne tous les contacts"""
+    decoder = TouchDecoder(event_size, max_slots)
+    batches = []
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            batches.append(decoder.feed(chunk))
+    return np.concatenate(batches) if batches else np.empty(0, dtype=TOUCH_DTYPE)
+
+
+def probe_touch_device(phone):
+    """Trouve l'écran tactile: (chemin, {"x": (min, max), "y": (min, max)}) ou (None, {})
+
+    Analyse `getevent -pl`: premier périphérique exposant ABS_MT_POSITION_X.
+    """
+    output = phone.run_adb_command("getevent -pl")
+    for block in re.split(r"\n(?=add device)", output):
+        device = re.search(r"add device \d+: (\S+)", block)
+        ranges = {}
+        for axis in ("X", "Y"):
+            match = re.search(rf"ABS_MT_POSITION_{axis}\s*:.*?min (-?\d+), max (-?\d+)", block)
+            if match:
+                ranges[axis.lower()] = (int(match.group(1)), int(match.group(2)))
+        if device and len(ranges) == 2:
+            return device.group(1), ranges
+    return None, {}
+
+
+class TouchEventReader:
+    """Lecture continue des événements tactiles bruts d'un appareil, hors de toute interface
+
+    Le fichier /dev/input/eventX est lu tel quel (`cat` via exec, ce que
+    `getevent` lit lui-même) dans un flux persistant, au lieu de la sortie
+    texte de `getevent -lt`. Chaque bloc reçu est décodé (TouchDecoder) et
+    les contacts sont publiés par lots dans une file bornée: si le
+    consommateur prend du retard, les lots les plus anciens sont
+    abandonnés (compteur dropped).
+    """
+
+    def __init__(self, phone, device=None, queue_size=256, event_size=None, max_slots=10):
+        self.phone = phone
+        if device is None:
+            device, self.ranges = probe_touch_device(phone)
+            if device is None:
+                raise RuntimeError("Aucun écran tactile multitouch trouvé (getevent -pl)")
+        else:
+            self.ranges = {}
+        self.device = device
+        if event_size is None:
+            # timeval de 16 octets sur les noyaux 64 bits
+            abi = phone.run_adb_command("getprop ro.product.cpu.abi")
+            event_size = 24 if "64" in abi else 16
+        self.decoder = TouchDecoder(event_size, max_slots)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._running = False
+        self._stream = None
+        self._thread = None
+
+    def _open(self):
+        command = f"cat {self.device}"
+        client = getattr(self.phone, "client", None)
+        if client is not None:
+            sock = client.open(f"exec:{command}")
+            sock.settimeout(None)  # Flux permanent: pas de délai de lecture
+            return sock, sock.recv_into
+        process = subprocess.Popen(self.phone.adb_prefix + ["exec-out", command],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return process, process.stdout.readinto
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._stream, read_into = self._open()
+        self._thread = threading.Thread(target=self._read_loop, args=(read_into,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _read_loop(self, read_into):
+        buffer = bytearray(1 << 16)
+        view = memoryview(buffer)
+        try:
+            while self._running:
+                count = read_into(view)
+                if not count:
+                    break
+                self._handle(view[:count])
+        except OSError as e:
+            if self._running:
+                print(f"Erreur lecture des événements tactiles: {str(e)}")
+        finally:
+            self._running = False
+            self._publish(None)  # Fin de flux
+
+    def _handle(self, data):
+        contacts = self.decoder.feed(data)
+        if len(contacts):
+            self._publish(contacts)
+
+    def _publish(self, contacts):
+        while True:
+            try:
+                self.queue.put_nowait(contacts)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Prochain lot de contacts (TOUCH_DTYPE), None en fin de flux ou si le délai expire"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def batches(self):
+        """Itère sur les lots jusqu'à l'arrêt du flux"""
+        while True:
+            contacts = self.queue.get()
+            if contacts is None:
+                return
+            yield contacts
+
+    def stop(self):
+        self._running = False
+        stream, self._stream = self._stream, None
+        if stream is None:
+            return
+        if isinstance(stream, subprocess.Popen):
+            stream.terminate()
+            return
+        try:
+            stream.shutdown(socket.SHUT_RDWR)  # Débloque le thread lecteur
+        except OSError:
+            pass
+        stream.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,174 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Bornes des classes d'histogramme (secondes), au format Prometheus (le = "inférieur ou égal")
+TRACE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC = "pipeline_stage_duration_seconds"
+
+# Traçage actif par défaut; TRACING=0 le désactive (les spans ne mesurent alors plus rien)
+_enabled = os.environ.get("TRACING", "1") != "0"
+_stages = {}  # {(étape, ((étiquette, valeur), ...)): StageHistogram}
+_lock = threading.Lock()
+_bucket_bounds_ns = [int(bound * 1e9) for bound in TRACE_BUCKETS]
+
+
+class StageHistogram:
+    """Durées d'une étape: histogramme cumulé + dernières mesures pour les quantiles"""
+
+    def __init__(self, history=1024):
+        self.counts = np.zeros(len(TRACE_BUCKETS) + 1, dtype=np.int64)
+        self.total_ns = 0
+        self.samples = np.zeros(history, dtype=np.int64)  # Tableau circulaire (ns)
+        self.count = 0
+
+    def add(self, duration_ns):
+        self.counts[bisect.bisect_left(_bucket_bounds_ns, duration_ns)] += 1
+        self.total_ns += duration_ns
+        self.samples[self.count % len(self.samples)] = duration_ns
+        self.count += 1
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Quantiles (secondes) sur les dernières mesures"""
+        recent = self.samples[:min(self.count, len(self.samples))]
+        if not len(recent):
+            return [None] * len(quantiles)
+        return list(np.quantile(recent, quantiles) / 1e9)
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+def observe(stage, seconds=None, duration_ns=None, **labels):
+    """Ajoute une durée mesurée à l'histogramme d'une étape"""
+    if not _enabled:
+        return
+    if duration_ns is None:
+        duration_ns = int(seconds * 1e9)
+    key = (stage, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _stages.get(key)
+        if histogram is None:
+            histogram = _stages[key] = StageHistogram()
+        histogram.add(duration_ns)
+
+
+class span:
+    """Chronomètre une étape (perf_counter_ns) et l'ajoute à son histogramme
+
+        with span("match", template="goto_city"):
+            ...
+    """
+
+    __slots__ = ("stage", "labels", "start", "duration_ns")
+
+    def __init__(self, stage, **labels):
+        self.stage = stage
+        self.labels = labels
+        self.duration_ns = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.duration_ns = time.perf_counter_ns() - self.start
+        observe(self.stage, duration_ns=self.duration_ns, **self.labels)
+
+    @property
+    def seconds(self):
+        return self.duration_ns / 1e9
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+
+def snapshot():
+    """{(étape, étiquettes): (nombre, somme en s, effectifs par classe, [p50, p95, p99])}"""
+    with _lock:
+        return {key: (histogram.count, histogram.total_ns / 1e9, histogram.counts.copy(), histogram.quantiles())
+                for key, histogram in _stages.items()}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(stage, labels, extra=()):
+    pairs = [("stage", stage), *labels, *extra]
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def prometheus_text():
+    """Histogrammes et quantiles au format texte Prometheus (exposition 0.0.4)"""
+    lines = [f"# HELP {METRIC} Durée des étapes capture -> décodage -> détection -> action",
+             f"# TYPE {METRIC} histogram"]
+    quantile_lines = [f"# HELP {METRIC}_quantile Quantiles sur les dernières mesures",
+                      f"# TYPE {METRIC}_quantile gauge"]
+    for (stage, labels), (count, total, counts, quantiles) in sorted(snapshot().items()):
+        cumulative = np.cumsum(counts)
+        for bound, value in zip(TRACE_BUCKETS, cumulative):
+            lines.append(f"{METRIC}_bucket{{{_label_text(stage, labels, [('le', f'{bound:g}')])}}} {value}")
+        lines.append(f"{METRIC}_bucket{{{_label_text(stage, labels, [('le', '+Inf')])}}} {count}")
+        lines.append(f"{METRIC}_sum{{{_label_text(stage, labels)}}} {total:.9f}")
+        lines.append(f"{METRIC}_count{{{_label_text(stage, labels)}}} {count}")
+        for q, value in zip(QUANTILES, quantiles):
+            if value is not None:
+                quantile_lines.append(f"{METRIC}_quantile{{{_label_text(stage, labels, [('quantile', f'{q:g}')])}}} {value:.9f}")
+    return "\n".join(lines + quantile_lines) + "\n"
+
+
+def write_prometheus(path):
+    """Écrit l'export dans un fichier (remplacement atomique, ex: collecteur textfile)"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Pas de ligne par requête
+
+
+def serve_prometheus(port=9108, host="127.0.0.1"):
+    """Sert l'export sur http://host:port/metrics dans un thread; retourne le serveur"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
+
+
+def report():
+    """Résumé lisible: une ligne par étape"""
+    lines = []
+    for (stage, labels), (count, total, _, (p50, p95, p99)) in sorted(snapshot().items()):
+        name = stage + "".join(f" {value}" for _, value in labels)
+        if count:
+            lines.append(f"{name}: {count} fois | moy {total / count * 1000:.1f} ms | p50 {p50 * 1000:.1f} ms | "
+                         f"p95 {p95 * 1000:.1f} ms | p99 {p99 * 1000:.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,141 @@
+import glob
+import heapq
+import json
+import os
+from collections import namedtuple
+
+from core.template_bank import TEMPLATES_DIR
+
+VIEW_GRAPH_CONFIG = os.path.join(TEMPLATES_DIR, "view_graph.json")
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "calibration_logs")
+
+# actions: liste de dictionnaires {"tap": [x, y]}, {"swipe": [x1, y1, x2, y2, ms]},
+# {"key": "KEYCODE_BACK"} ou {"wait": secondes}, exécutés dans l'ordre
+Edge = namedtuple("Edge", ["source", "target", "actions", "cost"])
+
+
+def edges_from_calibration_logs(directory=CALIBRATION_DIR, default_cost=2.0, session_gap=60):
+    """Transitions déduites des journaux de calibration
+
+    Les journaux sont rangés par heure d'affichage de la consigne; deux
+    modes calibrés à la suite (moins de session_gap secondes entre la
+    validation de l'un et la consigne de l'autre) donnent une transition
+    dont les actions sont les taps de l'utilisateur enregistrés pour le
+    second. Le tap scripté du calibrage (before_calibration) n'est pas une
+    action de l'utilisateur: il est ignoré, et une transition sans aucune
+    action réelle n'est pas créée. Le coût est inconnu (temps humain):
+    default_cost.
+    """
+    logs = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                log = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Journal de calibration illisible {path}: {str(e)}")
+            continue
+        events = {action.get("type"): action.get("timestamp") for action in log.get("actions", [])}
+        if log.get("mode") and events.get("prompt_displayed") is not None:
+            logs.append((events["prompt_displayed"], events.get("validation_received"), log))
+
+    edges = []
+    logs.sort(key=lambda entry: entry[0])
+    for (_, validated, previous), (prompted, _, current) in zip(logs, logs[1:]):
+        if validated is None or prompted - validated > session_gap or previous["mode"] == current["mode"]:
+            continue
+        actions = [{"tap": action["coord"]} for action in current["actions"]
+                   if action.get("type") == "tap" and action.get("coord") and not action.get("before_calibration")]
+        if actions:
+            edges.append(Edge(previous["mode"], current["mode"], actions, default_cost))
+    return edges
+
+
+class ViewGraph:
+    """Graphe des vues du jeu: transitions (actions + coût) et plus court chemin
+
+    Le coût d'une transition est sa durée estimée ou mesurée (secondes),
+    plus hop_cost par aller-retour: à durée égale, le chemin le plus court
+    en nombre d'actions est préféré.
+    """
+
+    def __init__(self, edges=(), hop_cost=0.2):
+        self.hop_cost = hop_cost
+        self._edges = {}  # {source: {cible: Edge}}
+        for edge in edges:
+            self.add_edge(*edge)
+
+    @classmethod
+    def load(cls, config_path=VIEW_GRAPH_CONFIG, calibration_dir=CALIBRATION_DIR):
+        """Graphe des journaux de calibration, complété/corrigé par la configuration"""
+        config = {}
+        if config_path and os.path.exists(config_path):
+            try:
+                with open(config_path, encoding="utf-8") as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Configuration du graphe illisible {config_path}: {str(e)}")
+
+        graph = cls(hop_cost=config.get("hop_cost", 0.2))
+        if calibration_dir:
+            for edge in edges_from_calibration_logs(calibration_dir):
+                graph.add_edge(*edge)
+        for entry in config.get("edges", []):
+            graph.add_edge(entry["from"], entry["to"], entry["actions"], entry.get("cost", 1.0))
+        return graph
+
+    def add_edge(self, source, target, actions, cost=1.0):
+        self._edges.setdefault(source, {})[target] = Edge(source, target, list(actions), float(cost))
+
+    def edge(self, source, target):
+        return self._edges.get(source, {}).get(target)
+
+    def edges(self):
+        return [edge for targets in self._edges.values() for edge in targets.values()]
+
+    def views(self):
+        return sorted(set(self._edges) | {target for targets in self._edges.values() for target in targets})
+
+    def set_cost(self, source, target, cost):
+        """Remplace le coût estimé d'une transition par une mesure"""
+        edge = self.edge(source, target)
+        if edge is not None:
+            self._edges[source][target] = edge._replace(cost=float(cost))
+
+    def update_costs(self, stats, q=50):
+        """Reprend les latences mesurées (TransitionStats) comme coûts"""
+        for source, target in stats.transitions():
+            self.set_cost(source, target, stats.percentile(source, target, q))
+
+    def plan(self, source, target):
+        """Suite de transitions la moins coûteuse de source à target (Dijkstra)
+
+        Retourne une liste d'Edge (vide si source == target), ou None si la
+        cible n'est pas atteignable.
+        """
+        if source == target:
+            return []
+        best = {source: 0.0}
+        previous = {}
+        queue = [(0.0, source)]
+        while queue:
+            cost, view = heapq.heappop(queue)
+            if view == target:
+                break
+            if cost > best.get(view, float("inf")):
+                continue  # Entrée périmée
+            for edge in self._edges.get(view, {}).values():
+                new_cost = cost + edge.cost + self.hop_cost
+                if new_cost < best.get(edge.target, float("inf")):
+                    best[edge.target] = new_cost
+                    previous[edge.target] = edge
+                    heapq.heappush(queue, (new_cost, edge.target))
+
+        if target not in previous:
+            return None
+        path = []
+        view = target
+        while view != source:
+            edge = previous[view]
+            path.append(edge)
+            view = edge.source
+        return path[::-1]
@@ -1,12 +1,14 @@
 import cv2
 import numpy as np
 import time
-import subprocess
-from phone_controller import PhoneController
+from core.frame_stream import FrameStream
+from core.loading_watcher import LoadingWatcher
+from core.phone_controller import PhoneController
+from view_detector import ViewDetector
 
 class GameLoader:
-    def __init__(self):
-        self.phone = PhoneController()
+    def __init__(self, device_id=None):
+        self.phone = PhoneController(device_id)
         self.post_launch_attempts = 20
         self.check_interval = 3
         self.pixel_x = 171
@@ -14,6 +16,11 @@ class GameLoader:
         self.expected_color = np.array([255, 255, 251])
         self.color_tolerance = 5
         self.game_package = "com.lilithgame.roc.gp"
+        self.lock_check_interval = 5  # Secondes entre deux vérifications de verrouillage
+        self._last_lock_check = 0
+        self.watcher = LoadingWatcher(self.phone, self.game_package,
+                                      (self.pixel_x, self.pixel_y),
+                                      self.expected_color, self.color_tolerance)
 
     def check_pixel_color(self, image):
         if image is None or np.mean(image) < 10:  # Détection écran noir
@@ -28,56 +35,33 @@ class GameLoader:
 
     def unlock_device(self):
         """Déverrouillage robuste pour Huawei/Android"""
-        try:
-            # 1. Allumer l'écran
-            subprocess.run(["adb", "shell", "input", "keyevent", "KEYCODE_POWER"], 
-                        timeout=2, check=True)
-            time.sleep(0.5)
-            
-            # 2. Glisser pour déverrouiller (coordonnées pour Huawei)
-            subprocess.run(["adb", "shell", "input", "swipe", "300", "1200", "300", "400", "200"],
-                        timeout=2, check=True)
-            time.sleep(1)
-            
-            # 3. Entrer le code PIN si nécessaire (à configurer)
-            # subprocess.run(["adb", "shell", "input", "text", "1234"], timeout=2)
-            # time.sleep(0.5)
-            
+        # Toute la séquence part en un seul aller-retour, attentes comprises (côté appareil)
+        batch = (self.phone.batch()
+                 .key("KEYCODE_POWER").wait(0.5)               # 1. Allumer l'écran
+                 .swipe(300, 1200, 300, 400, 200).wait(1))     # 2. Glisser pour déverrouiller (coordonnées pour Huawei)
+        # 3. Entrer le code PIN si nécessaire (à configurer)
+        # batch.text("1234").key("KEYCODE_ENTER").wait(0.5)
+
+        if batch.run():
             print("✅ Déverrouillage réussi")
             return True
-            
-        except subprocess.TimeoutExpired:
-            print("⚠️ Timeout déverrouillage - Réessayer")
-        except Exception as e:
-            print(f"⚠️ Erreur déverrouillage: {str(e)}")
-        
+        print("⚠️ Erreur déverrouillage - Réessayer")
         return False
 
     def check_phone_state(self):
         """Vérifie si l'appareil est verrouillé"""
-        try:
-            result = subprocess.run(
-                ["adb", "shell", "dumpsys", "window"],
-                stdout=subprocess.PIPE,
-                text=True,
-                timeout=5
-            )
-            return "mDreamingLockscreen=true" in result.stdout
-        except:
-            return False
+        # Filtrage côté appareil, via la session ADB persistante
+        output = self.phone.run_adb_command("dumpsys window | grep mDreamingLockscreen")
+        return "mDreamingLockscreen=true" in output
 
     def launch_game(self):
         """Lancement silencieux avec timeout réduit"""
         try:
             print("🚀 Lancement en cours...")
-            result = subprocess.run(
-                ["adb", "shell", "monkey", "-p", self.game_package, "1"],
-                stdout=subprocess.DEVNULL,  # Supprime les logs verbeux
-                stderr=subprocess.PIPE,
-                timeout=10
-            )
+            # Sortie verbeuse de monkey supprimée côté appareil
+            result = self.phone.shell.run(f"monkey -p {self.game_package} 1 >/dev/null", timeout=10)
             return result.returncode == 0
-        except subprocess.TimeoutExpired:
+        except TimeoutError:
             print("⚠️ Timeout lancement")
             return False
 
@@ -99,37 +83,65 @@ class GameLoader:
             print("✅ Jeu déjà en cours")
             return 1
         
-        # Lancement du jeu
+        # Lancement du jeu puis attente: logcat et capture continue au lieu de pauses fixes
         print("🚀 Lancement du jeu...")
+        print("⏳ Attente du chargement...")
         try:
-            subprocess.run(
-                ["adb", "shell", "monkey", "-p", self.game_package, "1"],
-                check=True,
-                timeout=15,
-                stdout=subprocess.DEVNULL
+            ready = self.watcher.wait_until_ready(
+                timeout=self.post_launch_attempts * self.check_interval,
+                launch=self._launch_or_raise,
+                on_sample=self._check_relock
             )
         except Exception as e:
             print(f"⚠️ Échec lancement: {str(e)}")
             return 0
         
-        # Attente chargement
-        print("⏳ Attente du chargement...")
-        for attempt in range(1, 21):
-            screenshot = self.phone.capture_screen()
-            if self.check_pixel_color(screenshot):
-                print(f"✅ Jeu chargé (tentative {attempt})")
-                return 1
-                
-            if self.check_phone_state():
-                print("📱 Re-verrouillage détecté!")
-                self.unlock_device()
-                
-            print(f"⌛ Tentative {attempt}/20")
-            time.sleep(3)
+        if ready:
+            print(f"✅ Jeu chargé ({self.watcher.report()})")
+            return 1
         
-        print("❌ Timeout de chargement")
+        print(f"❌ Timeout de chargement ({self.watcher.report()})")
         return 0
 
+    def _launch_or_raise(self):
+        if not self.launch_game():
+            raise RuntimeError("le jeu n'a pas pu être lancé")
+
+    def _check_relock(self):
+        """Vérifie le re-verrouillage au plus toutes les lock_check_interval secondes"""
+        now = time.monotonic()
+        if now - self._last_lock_check < self.lock_check_interval:
+            return
+        self._last_lock_check = now
+        if self.check_phone_state():
+            print("📱 Re-verrouillage détecté!")
+            self.unlock_device()
+
+def farm_worker(context):
+    """Travail d'un appareil de la ferme: chargement du jeu puis suivi de la vue affichée
+
+    Un échec de chargement lève une erreur: le superviseur relance le processus.
+    """
+    loader = GameLoader(context.serial)
+    if loader.wait_for_loading() != 1:
+        raise RuntimeError(f"{context.serial}: chargement du jeu échoué")
+    context.count("loads")
+
+    detector = ViewDetector()
+    with FrameStream.from_phone(loader.phone, capacity=2) as stream:
+        last_seq = 0
+        while not context.stopping:
+            frame = stream.wait_for_frame(last_seq, timeout=1.0)
+            if frame is None:
+                continue
+            context.count("dropped", frame.seq - last_seq - 1)
+            last_seq = frame.seq
+            view, _ = detector.detect_current_view(frame.image)
+            context.count("frames")
+            if view != 'inconnu':
+                context.count("views")
+    loader.phone.close()
+
 if __name__ == "__main__":
     print("Démarrage du système...")
     loader = GameLoader()
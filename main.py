@@ -1,17 +1,15 @@
+import argparse
 import subprocess
-subprocess.call([r"D:\Users\Documents\Code\Python\Entrainement\update_git.bat"])
 
-from game_loader import GameLoader
-from phone_controller import PhoneController
+from game_loader import GameLoader, farm_worker
+from core.device_farm import DeviceFarm
+from core.phone_controller import PhoneController
 import logging
 
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-loader = GameLoader()
-result = loader.wait_for_loading()  # Maintenant valide
-
 def main():
 
     phone = PhoneController()
@@ -23,20 +21,40 @@ def main():
 
     logging.info("Initialisation du système...")
     loader = GameLoader()
-    
+
     if loader.wait_for_loading() == 1:
         logging.info("Jeu complètement chargé!")
     else:
         logging.error("Échec du chargement")
 
 
+def run_farm(serials=None, duration=None):
+    """Un processus par appareil connecté (ou par numéro de série donné)"""
+    farm = DeviceFarm(farm_worker, serials)
+    farm.run(duration)
+    print(farm.report())
+
+
 if __name__ == "__main__":
+    # Code exécuté seulement au lancement: les processus de la ferme réimportent ce module
+    subprocess.call([r"D:\Users\Documents\Code\Python\Entrainement\update_git.bat"])
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device", default=None, help="Numéro de série de l'appareil")
+    parser.add_argument("--farm", action="store_true", help="Tous les appareils connectés en parallèle")
+    parser.add_argument("--serials", nargs="*", default=None, help="Appareils de la ferme (défaut: tous)")
+    parser.add_argument("--duration", type=float, default=None, help="Durée de la ferme en secondes")
+    args = parser.parse_args()
+
     try:
-        loader = GameLoader()
-        if loader.wait_for_loading() == 1:
-            print("Jeu prêt!")
+        if args.farm:
+            run_farm(args.serials, args.duration)
         else:
-            print("Échec du chargement")
+            loader = GameLoader(args.device)
+            if loader.wait_for_loading() == 1:
+                print("Jeu prêt!")
+            else:
+                print("Échec du chargement")
 
     except Exception as e:
-        print(f"Erreur : {e}")
\ No newline at end of file
+        print(f"Erreur : {e}")
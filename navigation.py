@@ -1,18 +1,171 @@
+import time
+
+from core import tracing
+from core.frame_stream import FrameStream
+from core.template_detector import TemplateViewDetector
+from core.view_graph import ViewGraph
+
+
+class TransitionStats:
+    """Latences mesurées par transition (vue de départ, vue d'arrivée)
+
+    Chaque transition a son tracing.StageHistogram (classes TRACE_BUCKETS,
+    dernières mesures pour les percentiles). Les latences sont aussi
+    publiées dans l'export de tracing (étape "transition").
+    """
+
+    def __init__(self, history=200):
+        self.history = history
+        self._histograms = {}
+
+    def record(self, from_view, to_view, latency):
+        histogram = self._histograms.get((from_view, to_view))
+        if histogram is None:
+            histogram = self._histograms[(from_view, to_view)] = tracing.StageHistogram(self.history)
+        duration_ns = int(latency * 1e9)
+        histogram.add(duration_ns)
+        tracing.observe("transition", duration_ns=duration_ns, source=from_view, target=to_view)
+
+    def transitions(self):
+        return list(self._histograms)
+
+    def histogram(self, from_view, to_view):
+        """Effectifs par classe: [<=TRACE_BUCKETS[0], ..., <=TRACE_BUCKETS[-1], au-delà]"""
+        histogram = self._histograms.get((from_view, to_view))
+        return histogram.counts if histogram is not None else None
+
+    def percentile(self, from_view, to_view, q=50):
+        histogram = self._histograms.get((from_view, to_view))
+        return float(histogram.quantiles((q / 100,))[0]) if histogram is not None else None
+
+    def report(self):
+        lines = []
+        for (from_view, to_view), histogram in self._histograms.items():
+            p50, p95 = histogram.quantiles((0.5, 0.95))
+            lines.append(f"{from_view} -> {to_view}: {histogram.count} fois | "
+                         f"p50 {p50 * 1000:.0f} ms | p95 {p95 * 1000:.0f} ms")
+        return "\n".join(lines)
+
+
 class NavigationController:
-    def __init__(self, phone):
+    """Navigation entre vues sans pause fixe après chaque tap
+
+    Le chemin vient du graphe des vues (ViewGraph, plus court chemin) et
+    est recalculé après chaque transition: arriver sur une vue inattendue
+    relance simplement la planification depuis cette vue. Un seul
+    détecteur et un flux de captures rapide: juste après les actions, les
+    images sont classées jusqu'à ce qu'une autre vue apparaisse. Sans
+    changement après transition_timeout, les actions sont renvoyées
+    (retries fois). La latence de chaque transition (actions -> première
+    image de la nouvelle vue) est enregistrée dans self.stats et devient
+    le coût de la transition dans le graphe.
+    """
+
+    def __init__(self, phone, detector=None, stream=None, graph=None, transition_timeout=5.0,
+                 retries=2, max_steps=10):
         self.phone = phone
-        self.view_actions = {
-            'ville': {'tap': (1200, 700)},  # Bouton monde
-            'alentour': {'tap': (100, 100)}, # Bouton ville
-            # ...
-        }
+        self.detector = detector or TemplateViewDetector()
+        self.graph = graph or ViewGraph.load()
+        self.transition_timeout = transition_timeout
+        self.retries = retries
+        self.max_steps = max_steps
+        self.stats = TransitionStats()
+        self._own_stream = stream is None
+        self.stream = stream
+
+    def _frames(self):
+        if self.stream is None:
+            self.stream = FrameStream.from_phone(self.phone, capacity=2)
+        if not self.stream.is_running():
+            self.stream.start()
+        return self.stream
+
+    def current_view(self, timeout=2.0):
+        """(vue, image) de la dernière capture"""
+        stream = self._frames()
+        frame = stream.latest_frame() or stream.wait_for_frame(0, timeout)
+        if frame is None:
+            return None, None
+        view, _ = self.detector.detect_current_view(frame.image)
+        return view, frame
+
+    def wait_for_change(self, from_view, after_seq, timeout):
+        """Attend la première image postérieure à after_seq montrant une vue connue différente
+
+        Les images de l'animation (vue 'inconnu') sont ignorées. Retourne
+        (vue, image) ou (None, None) si le délai expire.
+        """
+        stream = self._frames()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, None
+            frame = stream.wait_for_frame(after_seq, remaining)
+            if frame is None:
+                continue
+            after_seq = frame.seq
+            view, _ = self.detector.detect_current_view(frame.image)
+            if view != from_view and view != 'inconnu':
+                return view, frame
+
+    def _run_actions(self, actions):
+        """Envoie les actions d'une transition en un seul lot"""
+        batch = self.phone.batch()
+        for action in actions:
+            for kind, args in action.items():
+                if kind == "wait":
+                    batch.wait(args)
+                elif kind == "key":
+                    batch.key(*([args] if isinstance(args, str) else args))
+                else:
+                    getattr(batch, kind)(*args)
+        return batch.run()
+
+    def step(self, edge, frame):
+        """Exécute une transition et attend la vue suivante (avec renvois des actions)"""
+        for attempt in range(self.retries + 1):
+            sent_at = time.time()
+            self._run_actions(edge.actions)
+            view, new_frame = self.wait_for_change(edge.source, frame.seq, self.transition_timeout)
+            if view is not None:
+                self.stats.record(edge.source, view, max(new_frame.timestamp - sent_at, 0.0))
+                if view == edge.target:
+                    self.graph.set_cost(edge.source, edge.target, self.stats.percentile(edge.source, view))
+                else:
+                    print(f"Vue inattendue: {view} au lieu de {edge.target}")
+                return view, new_frame
+            print(f"Pas de changement de vue depuis {edge.source} (essai {attempt + 1}/{self.retries + 1})")
+        return None, None
 
     def switch_view(self, target_view):
-        """Change de mode de vue"""
-        current_view = ViewDetector().detect_current_view(self.phone.capture_screen())
-        
-        while current_view != target_view:
-            action = self.view_actions.get(current_view)
-            self.phone.tap(*action['tap'])
-            time.sleep(2)  # Temps de transition
-            current_view = ViewDetector().detect_current_view(self.phone.capture_screen())
\ No newline at end of file
+        """Change de mode de vue; retourne True si la vue cible est atteinte"""
+        current_view, frame = self.current_view()
+        if frame is None:
+            print("Aucune capture disponible")
+            return False
+
+        for _ in range(self.max_steps):
+            if current_view == target_view:
+                return True
+            if current_view == 'inconnu':
+                # Animation en cours: on attend une vue reconnue
+                current_view, frame = self.wait_for_change(current_view, frame.seq, self.transition_timeout)
+                if current_view is None:
+                    print("Aucune vue reconnue")
+                    return False
+                continue
+            path = self.graph.plan(current_view, target_view)
+            if not path:
+                print(f"Aucun chemin connu de {current_view} vers {target_view}")
+                return False
+            # Seule la première transition est jouée: le chemin est recalculé depuis la vue obtenue
+            current_view, frame = self.step(path[0], frame)
+            if current_view is None:
+                return False
+        print(f"Vue {target_view} non atteinte après {self.max_steps} transitions")
+        return False
+
+    def close(self):
+        if self._own_stream and self.stream is not None:
+            self.stream.stop()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.phone_controller import PhoneController
+
+
+def cpu_time():
+    """Temps CPU de l'hôte (processus + enfants adb quand l'OS le fournit)"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def bench(label, capture, frames):
+    """Mesure images/s et temps CPU par image pour une méthode de capture"""
+    capture()  # Échauffement (connexion, caches)
+    start_wall, start_cpu = time.perf_counter(), cpu_time()
+    failures = 0
+    for _ in range(frames):
+        if capture() is None:
+            failures += 1
+    wall = time.perf_counter() - start_wall
+    cpu = cpu_time() - start_cpu
+    print(f"{label:<22} {frames / wall:6.2f} img/s | "
+          f"{wall / frames * 1000:7.1f} ms/img | CPU {cpu / frames * 1000:6.1f} ms/img | "
+          f"échecs: {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare la capture PNG et la capture brute")
+    parser.add_argument("--device", default=None, help="Numéro de série de l'appareil")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--backend", choices=["socket", "cli"], default="socket",
+                        help="Protocole ADB direct ou binaire adb")
+    args = parser.parse_args()
+
+    phone = PhoneController(args.device, backend=args.backend)
+    print(f"Résolution: {phone.resolution[0]}x{phone.resolution[1]} - {args.frames} captures "
+          f"(backend {phone.backend})\n")
+
+    bench("PNG + écriture disque", lambda: phone.capture_screen("screen.png", mode="png"), args.frames)
+    bench("PNG", lambda: phone.capture_screen(mode="png"), args.frames)
+    bench("Brut -> BGR", lambda: phone.capture_screen(mode="raw"), args.frames)
+    bench("Brut (vue RGBA)", lambda: phone.capture_raw()[0], args.frames)
+    phone.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.matching import match_template
+from core.template_bank import TemplateBank
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Précision et vitesse de la recherche pyramidale")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--templates", nargs="+",
+                        default=["goto_city", "goto_map", "explore_marker", "mail_button"])
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    bank = TemplateBank()
+    frames = [cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2GRAY)
+              for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "screen_*.png")))]
+    print(f"{len(frames)} images, templates: {', '.join(args.templates)} (image entière)\n")
+
+    def run(levels):
+        results, start = [], time.perf_counter()
+        for gray in frames:
+            for name in args.templates:
+                template = bank.get(name)
+                results.append(match_template(gray, template.gray, template.mask,
+                                              args.threshold, levels=levels))
+        return results, (time.perf_counter() - start) / len(frames)
+
+    reference, ref_time = run(0)
+    print(f"{'niveaux':<8} {'ms/image':>9} {'gain':>6} {'détection ok':>13} {'position ok':>12} {'écart conf.':>12}")
+    print(f"{0:<8} {ref_time * 1000:9.1f} {1:6.1f}x {'-':>13} {'-':>12} {'-':>12}")
+
+    for levels in args.levels:
+        results, elapsed = run(levels)
+        same_detection = sum(r['detected'] == ref['detected'] for r, ref in zip(results, reference))
+        detected = [(r, ref) for r, ref in zip(results, reference) if ref['detected']]
+        same_location = sum(max(abs(r['location'][0] - ref['location'][0]),
+                                abs(r['location'][1] - ref['location'][1])) <= 1
+                            for r, ref in detected)
+        worst_gap = max((ref['confidence'] - r['confidence'] for r, ref in detected), default=0.0)
+        print(f"{levels:<8} {elapsed * 1000:9.1f} {ref_time / elapsed:6.1f}x "
+              f"{same_detection:>6}/{len(results):<6} {same_location:>5}/{len(detected):<6} {worst_gap:12.4f}")
+
+
+if __name__ == "__main__":
+    main()
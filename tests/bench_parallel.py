@@ -0,0 +1,61 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.matching import set_pool_size
+from core.resource_detector import ResourceDetector
+from core.roi_registry import RoiRegistry
+from core.template_bank import TemplateBank
+from core.template_detector import TemplateDetector
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+VIEW_TEMPLATES = {
+    'goto_city': {'check_violet': False},
+    'goto_map': {'check_violet': False},
+    'explore_marker': {'check_violet': True},
+    'mail_button': {'check_violet': False},
+}
+
+
+def bench(detect, frames, repeat):
+    detect(frames[0])  # Échauffement: création des threads
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for image in frames:
+            detect(image)
+    return (time.perf_counter() - start) / (len(frames) * repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mise à l'échelle de la correspondance sur 1 à N threads")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    bank = TemplateBank()
+    frames = [cv2.imread(path) for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "screen_*.png")))]
+    # Sans ROI ni pyramide: on mesure la correspondance pleine image pure
+    no_roi = RoiRegistry(config_path=None, learned_path=None, learn=False)
+    views = TemplateDetector(VIEW_TEMPLATES, bank, rois=no_roi, pyramid_levels=0)
+    resources = ResourceDetector(bank)
+    print(f"{len(frames)} images, {os.cpu_count()} cœurs\n")
+
+    print(f"{'threads':<8} {'vues ms/img':>12} {'gain':>6} {'ressources ms/img':>18} {'gain':>6}")
+    baseline = None
+    for workers in range(1, max(args.max_workers, 1) + 1):
+        set_pool_size(workers)
+        timings = (bench(views.detect, frames, args.repeat), bench(resources.detect, frames, args.repeat))
+        baseline = baseline or timings
+        print(f"{workers:<8} {timings[0] * 1000:12.1f} {baseline[0] / timings[0]:5.2f}x "
+              f"{timings[1] * 1000:18.1f} {baseline[1] / timings[1]:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import argparse
+import os
+import signal
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_test.png")
+FEATURES = "shell_v2,cmd,stat_v2"
+
+# Commandes de l'appareil simulées par de petits scripts sh (voir make_device)
+DEVICE_SCRIPTS = {
+    "screencap": """if [ "$1" = "-p" ]; then exec cat "{root}/screen.png"; fi
+exec cat "{root}/screen.raw"
+""",
+    "getprop": """case "$1" in
+  ro.serialno) echo {serial};;
+  ro.product.model) echo {model};;
+  *) echo;;
+esac
+""",
+    "wm": """case "$1" in
+  size) echo "Physical size: {width}x{height}";;
+  density) echo "Physical density: 420";;
+esac
+""",
+    "dumpsys": """case "$1" in
+  window) if [ "$2" = "displays" ]; then echo "    mCurrentRotation=ROTATION_90"
+          else echo "    mShowingLockscreen=false mDreamingLockscreen=false"; fi;;
+esac
+""",
+    "input": """echo "$*" >> "{root}/input.log"
+""",
+}
+
+
+def make_device(image, serial, model):
+    """Crée le faux appareil: scripts des commandes et écran (brut RGBA et PNG)"""
+    root = tempfile.mkdtemp(prefix="fake_adb_")
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(bin_dir)
+    height, width = image.shape[:2]
+    for name, body in DEVICE_SCRIPTS.items():
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write("#!/bin/sh\n" + body.format(root=root, serial=serial, model=model,
+                                                width=width, height=height))
+        os.chmod(path, 0o755)
+
+    rgba = cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+    with open(os.path.join(root, "screen.raw"), "wb") as f:
+        f.write(struct.pack("<4I", width, height, 1, 0))  # Format RGBA + espace colorimétrique
+        f.write(rgba.tobytes())
+    cv2.imwrite(os.path.join(root, "screen.png"), image)
+    return root
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Client déconnecté")
+        data += chunk
+    return data
+
+
+def _reply(sock, payload=None):
+    message = b"OKAY"
+    if payload is not None:
+        payload = payload.encode("utf-8")
+        message += b"%04x" % len(payload) + payload
+    sock.sendall(message)
+
+
+def _fail(sock, message):
+    message = message.encode("utf-8")
+    sock.sendall(b"FAIL" + b"%04x" % len(message) + message)
+
+
+class FakeAdbHandler(socketserver.BaseRequestHandler):
+    """Une connexion client: requêtes host:*, puis un service après host:transport"""
+
+    def handle(self):
+        sock = self.request
+        try:
+            while True:
+                length = int(_recv_exact(sock, 4), 16)
+                request = _recv_exact(sock, length).decode("utf-8")
+                if request.startswith("host:transport"):
+                    if request not in ("host:transport-any", f"host:transport:{self.server.serial}"):
+                        return _fail(sock, f"device '{request[15:]}' not found")
+                    _reply(sock)
+                    continue
+                if request.startswith("host"):
+                    return self.host(sock, request)
+                return self.service(sock, request)
+        except (ConnectionError, OSError):
+            pass
+
+    def host(self, sock, request):
+        command = request.rsplit(":", 1)[1]
+        if command == "version":
+            _reply(sock, "0029")
+        elif command == "features":
+            _reply(sock, FEATURES)
+        elif command == "get-serialno":
+            _reply(sock, self.server.serial)
+        elif command == "devices":
+            _reply(sock, f"{self.server.serial}\tdevice\n")
+        elif command == "kill":
+            _reply(sock)
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            _fail(sock, f"unknown host service {request}")
+
+    def service(self, sock, request):
+        kind, _, command = request.partition(":")
+        if kind == "sync":
+            _reply(sock)
+            return self.sync(sock)
+        if kind not in ("exec", "shell", "shell,v2,raw", "shell,v2"):
+            return _fail(sock, f"unknown service {request}")
+        process = subprocess.Popen(
+            ["sh", "-c", command] if command else ["sh"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if kind.startswith("shell,v2") else subprocess.STDOUT,
+            cwd=self.server.root,
+            env=self.server.env,
+            start_new_session=True  # Pour tuer aussi les sous-processus à la déconnexion
+        )
+        _reply(sock)
+        try:
+            if kind.startswith("shell,v2"):
+                self.shell_v2(sock, process)
+            else:
+                process.stdin.close()
+                for chunk in iter(lambda: process.stdout.read1(65536), b""):
+                    sock.sendall(chunk)
+        finally:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            process.wait()
+
+    @staticmethod
+    def shell_v2(sock, process):
+        """Protocole shell v2: paquets (id, longueur) dans les deux sens, code de retour final"""
+        send_lock = threading.Lock()
+
+        def send(packet_id, data):
+            with send_lock:
+                sock.sendall(struct.pack("<BI", packet_id, len(data)) + data)
+
+        def pump(stream, packet_id):
+            for chunk in iter(lambda: stream.read1(65536), b""):
+                send(packet_id, chunk)
+
+        def finish():
+            for thread in pumps:
+                thread.join()
+            try:
+                send(3, bytes([process.wait() & 0xFF]))
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # Client déjà parti
+
+        pumps = [threading.Thread(target=pump, args=(process.stdout, 1), daemon=True),
+                 threading.Thread(target=pump, args=(process.stderr, 2), daemon=True)]
+        for thread in pumps:
+            thread.start()
+        threading.Thread(target=finish, daemon=True).start()
+
+        while True:
+            try:
+                packet_id, length = struct.unpack("<BI", _recv_exact(sock, 5))
+                data = _recv_exact(sock, length)
+            except OSError:
+                return  # Client parti ou processus terminé
+            if packet_id == 0:
+                process.stdin.write(data)
+                process.stdin.flush()
+            elif packet_id == 4:
+                process.stdin.close()
+
+    def local_path(self, remote_path):
+        return os.path.join(self.server.root, remote_path.lstrip("/"))
+
+    def sync(self, sock):
+        """Protocole sync: SEND, RECV, STAT et QUIT sur l'arborescence du faux appareil"""
+        while True:
+            command, length = struct.unpack("<4sI", _recv_exact(sock, 8))
+            if command == b"QUIT":
+                return
+            path = _recv_exact(sock, length).decode("utf-8")
+            if command == b"SEND":
+                path, mode = path.rsplit(",", 1)
+                data = b""
+                while True:
+                    chunk_id, size = struct.unpack("<4sI", _recv_exact(sock, 8))
+                    if chunk_id == b"DONE":
+                        break
+                    data += _recv_exact(sock, size)
+                local = self.local_path(path)
+                os.makedirs(os.path.dirname(local), exist_ok=True)
+                with open(local, "wb") as f:
+                    f.write(data)
+                os.chmod(local, int(mode) & 0o777)
+                sock.sendall(struct.pack("<4sI", b"OKAY", 0))
+            elif command == b"RECV":
+                local = self.local_path(path)
+                if not os.path.isfile(local):
+                    message = b"No such file or directory"
+                    sock.sendall(struct.pack("<4sI", b"FAIL", len(message)) + message)
+                    continue
+                with open(local, "rb") as f:
+                    for chunk in iter(lambda: f.read(65536), b""):
+                        sock.sendall(struct.pack("<4sI", b"DATA", len(chunk)) + chunk)
+                sock.sendall(struct.pack("<4sI", b"DONE", 0))
+            elif command == b"STAT":
+                try:
+                    info = os.stat(self.local_path(path))
+                    values = (info.st_mode, info.st_size, int(info.st_mtime))
+                except OSError:
+                    values = (0, 0, 0)
+                sock.sendall(struct.pack("<4s3I", b"STAT", *values))
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """Serveur ADB de substitution: un appareil simulé, commandes exécutées par sh en local"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port=0, image=None, serial="fake-0001", model="FakePhone"):
+        super().__init__(("127.0.0.1", port), FakeAdbHandler)
+        image = cv2.imread(DEFAULT_IMAGE) if image is None else image
+        if image is None:
+            image = np.zeros((1080, 2244, 3), dtype=np.uint8)
+        self.serial = serial
+        self.model = model
+        self.shape = image.shape
+        self.root = make_device(image, serial, model)
+        self.env = dict(os.environ, PATH=os.path.join(self.root, "bin") + os.pathsep + os.environ.get("PATH", ""))
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Sert dans un thread de fond (utilisation depuis un script de test)"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def check(server):
+    """Vérifie le client et PhoneController contre le faux serveur (AssertionError en cas d'écart)"""
+    os.environ["ANDROID_ADB_SERVER_PORT"] = str(server.port)
+    from core.adb_client import AdbClient
+    from core.phone_controller import PhoneController
+
+    client = AdbClient(port=server.port)
+    version = client.host_request("host:version")
+    print("Version:", version)
+    assert version == "0029", version
+    assert client.get_serialno() == server.serial
+
+    result = client.shell("getprop ro.product.model; exit 3")
+    print("Shell:", result)
+    assert result.output.strip() == server.model and result.returncode == 3, result
+    assert client.shell("true").returncode == 0
+
+    script = b"echo pushed\n"
+    client.push(script, "/data/local/tmp/check.sh", mode=0o755)
+    pulled = client.pull("/data/local/tmp/check.sh")
+    mode, size, _ = client.stat("/data/local/tmp/check.sh")
+    print("Pull:", pulled, "Stat:", (oct(mode), size))
+    assert pulled == script and size == len(script) and mode & 0o777 == 0o755
+    client.close()
+
+    # Cache des profils temporaire: le vrai ~/.entrainement n'est pas touché
+    cache_path = os.path.join(server.root, "device_profiles.json")
+    phone = PhoneController(profile_cache=cache_path)
+    print(f"Backend: {phone.backend} | Résolution: {phone.resolution} | Densité: {phone.density}")
+    height, width = server.shape[:2]
+    assert phone.backend == "socket"
+    assert phone.serial == server.serial and phone.resolution == (width, height) and phone.density == 420
+    assert phone.orientation == 1
+    assert os.path.exists(cache_path)
+
+    image = phone.capture_screen()
+    print("Capture:", None if image is None else image.shape)
+    assert image is not None and image.shape == (height, width, 3)
+    png = phone.capture_screen(mode="png")
+    assert png is not None and png.shape == image.shape
+    rgba, pixel_format = phone.capture_raw()
+    assert rgba.shape == (height, width, 4) and pixel_format == "RGBA"
+
+    phone.tap(100, 200)
+    with open(os.path.join(server.root, "input.log")) as f:
+        inputs = f.read().strip()
+    print("Entrées reçues:", inputs)
+    assert inputs == "tap 100 200", inputs
+    phone.close()
+    print("Vérification OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux serveur ADB pour tester le client sans appareil")
+    parser.add_argument("--port", type=int, default=5038, help="Port d'écoute (5037: celui du vrai serveur)")
+    parser.add_argument("--image", default=None, help="Image affichée par l'écran simulé")
+    parser.add_argument("--serial", default="fake-0001")
+    parser.add_argument("--check", action="store_true", help="Lance le serveur et vérifie le client")
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image) if args.image else None
+    server = FakeAdbServer(0 if args.check else args.port, image, args.serial)
+    if args.check:
+        check(server.start())
+        server.shutdown()
+        return
+    print(f"Faux serveur ADB sur 127.0.0.1:{server.port} (appareil {args.serial}, racine {server.root})")
+    print(f"Exemple: ANDROID_ADB_SERVER_PORT={server.port} python tests/bench_capture.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
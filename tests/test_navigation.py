@@ -0,0 +1,93 @@
+import os
+import sys
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.adb_session import ShellResult
+from core.frame_stream import FrameStream
+from core.input_batch import InputBatch
+from core.roi_registry import RoiRegistry
+from core.template_detector import TemplateViewDetector
+from core.view_graph import ViewGraph
+from navigation import NavigationController
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Captures réelles: vue ville (bouton carte) et vue carte (bouton ville)
+CITY_FRAME = os.path.join(RESULTS_DIR, "screen_0006.png")
+MAP_FRAME = os.path.join(RESULTS_DIR, "screen_0004.png")
+
+
+class FakeShell:
+    def __init__(self, phone):
+        self.phone = phone
+
+    def run(self, command, timeout=None):
+        for part in command.split("&&"):
+            words = part.split()
+            if words[:2] == ["input", "tap"]:
+                self.phone.tap(int(words[2]), int(words[3]))
+        return ShellResult("", 0)
+
+
+class FakePhone:
+    """Écran simulé par les captures de tests/results: le bouton ville/carte bascule de l'une à l'autre"""
+
+    def __init__(self, view="city_view"):
+        self.frames = {"city_view": cv2.imread(CITY_FRAME), "map_view": cv2.imread(MAP_FRAME)}
+        self.view = view
+        self.taps = []
+        self.shell = FakeShell(self)
+
+    def tap(self, x, y):
+        self.taps.append((x, y))
+        if 100 <= x <= 220 and 930 <= y <= 1030:
+            self.view = "map_view" if self.view == "city_view" else "city_view"
+
+    def batch(self):
+        return InputBatch(self)
+
+    def capture(self):
+        return self.frames[self.view]
+
+
+def make_controller(phone):
+    detector = TemplateViewDetector(rois=RoiRegistry(learned_path=None, learn=False))
+    stream = FrameStream(phone.capture, capacity=2, interval=0.01)
+    return NavigationController(phone, detector=detector, stream=stream, graph=ViewGraph.load(),
+                                transition_timeout=2.0, retries=1)
+
+
+def test_views_detected_on_results_frames():
+    detector = TemplateViewDetector(rois=RoiRegistry(learned_path=None, learn=False))
+    assert detector.detect_current_view(cv2.imread(CITY_FRAME))[0] == "city_view"
+    assert detector.detect_current_view(cv2.imread(MAP_FRAME))[0] == "map_view"
+
+
+def test_plan_between_template_views():
+    graph = ViewGraph.load()
+    path = graph.plan("city_view", "map_view")
+    assert path is not None and [edge.target for edge in path] == ["map_view"]
+    assert [edge.target for edge in graph.plan("map_view", "city_view")] == ["city_view"]
+
+
+def test_switch_view_converges():
+    phone = FakePhone("city_view")
+    navigation = make_controller(phone)
+    try:
+        assert navigation.switch_view("map_view")
+        assert phone.view == "map_view"
+        assert navigation.switch_view("city_view")
+        assert phone.view == "city_view"
+        assert len(phone.taps) == 2
+        assert navigation.stats.percentile("city_view", "map_view") is not None
+    finally:
+        navigation.close()
+
+
+if __name__ == "__main__":
+    test_views_detected_on_results_frames()
+    test_plan_between_template_views()
+    test_switch_view_converges()
+    print("Navigation OK")
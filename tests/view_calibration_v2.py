@@ -1,111 +1,31 @@
-import cv2
-import numpy as np
-import subprocess
+import os
+import sys
 import tkinter as tk
 from threading import Thread
 import time
-from queue import Queue
-import logging
 
-# Initialiser le logging
-logging.basicConfig(filename='actions_log.txt', level=logging.INFO, format='%(asctime)s - %(message)s')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Capture via adb (optimisé en utilisant directement la mémoire)
-def capture_screen_via_adb():
-    process = subprocess.run(["adb", "exec-out", "screencap", "-p"], capture_output=True)
-    return np.frombuffer(process.stdout, np.uint8)
+from core.change_detector import ChangeDetector
+from core.event_log import EventLog
+from core.frame_stream import FrameStream
+from core.phone_controller import PhoneController
+from core.roi_registry import RoiRegistry
+from core.template_bank import TemplateBank
+from core.template_detector import TemplateDetector, determine_final_view
+from core import tracing
+from core.tracing import span
 
-# Fonction de détection optimisée
-def detect_view(image_data, templates, threshold=0.8, violet_threshold=0.7):
-    image = cv2.imdecode(image_data, cv2.IMREAD_COLOR)
-    if image is None:
-        print("Erreur: Impossible de charger l'image")
-        return None, None
+# Journal d'événements (JSON Lines, UTF-8): écrit par un thread dédié, sans bloquer la détection
+event_log = EventLog('actions_log.jsonl')
 
-    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    results = {}
-
-    # Optimiser la détection en travaillant sur des zones spécifiques
-    for view_name, template_info in templates.items():
-        template_path = template_info['path']
-        template = cv2.imread(template_path, cv2.IMREAD_COLOR)
-        if template is None:
-            continue
-
-        search_area = gray_image
-        search_offset = (0, 0)
-
-        # Limiter les zones à analyser (comme pour le mail_button)
-        if view_name == 'explore_marker':
-            x1, y1, x2, y2 = 85, 449, 354, 528
-            search_area = gray_image[y1:y2, x1:x2]
-            search_offset = (x1, y1)
-
-        if view_name == 'mail_button':
-            x1, y1, x2, y2 = 1922, 971, 1984, 1027
-            search_area = gray_image[y1:y2, x1:x2]
-            search_offset = (x1, y1)
-
-        # Utilisation d'un seuil de confiance plus élevé pour éviter les faux positifs
-        res = cv2.matchTemplate(search_area, cv2.cvtColor(template, cv2.COLOR_BGR2GRAY), cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(res)
-        max_loc = (max_loc[0] + search_offset[0], max_loc[1] + search_offset[1])
-
-        violet_percent = 0
-        if template_info.get('check_violet', False):
-            x, y = max_loc
-            w, h = template.shape[1], template.shape[0]
-            roi = image[y:y+h, x:x+w]
-            hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-            lower_violet = np.array([130, 50, 50])
-            upper_violet = np.array([160, 255, 255])
-            mask = cv2.inRange(hsv, lower_violet, upper_violet)
-            violet_percent = np.sum(mask > 0) / (w * h)
-
-        detected = max_val >= threshold
-        if template_info.get('check_violet', False):
-            detected = detected and (violet_percent >= violet_threshold)
-
-        results[view_name] = {
-            'detected': bool(detected),
-            'confidence': float(max_val),
-            'violet_percent': float(violet_percent),
-            'location': max_loc
-        }
-
-    return results, image
-
-# Fonction pour déterminer la vue
-def determine_final_view(detected):
-    if not detected['goto_city']['detected'] and detected['goto_map']['detected'] and not detected['explore_marker']['detected'] and not detected['mail_button']['detected']:
-        return "city_view"
-    elif detected['goto_city']['detected'] and not detected['goto_map']['detected'] and detected['explore_marker']['detected'] and not detected['mail_button']['detected']:
-        return "explore_view"
-    elif detected['goto_city']['detected'] and not detected['goto_map']['detected'] and not detected['explore_marker']['detected'] and not detected['mail_button']['detected']:
-        return "map_view"
-    elif detected['goto_city']['detected'] and not detected['goto_map']['detected'] and detected['explore_marker']['detected'] and detected['mail_button']['detected']:
-        return "kingdom_view"
-    else:
-        return "unknown"
+# Templates et zones de recherche chargés une seule fois pour toutes les images
+template_bank = TemplateBank()
+roi_registry = RoiRegistry()
 
 # Fonction pour loguer les actions de l'utilisateur
 def log_user_action(action, view):
-    logging.info(f"Action: {action} - Vue détectée: {view}")
-
-# Fonction pour mesurer la latence entre deux détections
-last_detection_time = None
-latency = 0
-
-def measure_latency():
-    global last_detection_time, latency
-    current_time = time.time()
-
-    # Si une action manuelle a été effectuée, on mesure la latence
-    if last_detection_time is not None:
-        latency = current_time - last_detection_time
-        logging.info(f"Latence de détection: {latency:.4f} secondes")
-
-    last_detection_time = current_time
+    event_log.event("action", action=action, view=view)
 
 # Fonction principale pour Tkinter
 def main_loop():
@@ -134,39 +54,54 @@ def main_loop():
     label = tk.Label(root, font=("Helvetica", 24))
     label.pack()
 
-    # File d'attente pour stocker les images capturées
-    capture_queue = Queue()
+    # Flux de capture continu: tampon circulaire, les images périmées sont écrasées
+    stream = FrameStream.from_phone(PhoneController(), capacity=2).start()
 
-    # Thread pour la capture continue des images
-    def capture_thread():
-        while True:
-            image_data = capture_screen_via_adb()
-            capture_queue.put(image_data)
-            time.sleep(0.05)  # Fréquence de capture des images (environ toutes les 50 ms)
+    # Détecteur unique: ne recalcule que les templates dont la zone a changé
+    detector = TemplateDetector(templates, template_bank, rois=roi_registry,
+                                change_detector=ChangeDetector())
 
     # Thread pour le traitement des images capturées
+    # Durée de chaque étape (capture, décodage, gris, chaque template, décision, affichage):
+    # histogrammes exportés sur http://127.0.0.1:9108/metrics
+    tracing.serve_prometheus(9108)
+
     def process_thread():
+        last_seq = 0
+        view = None
+        last_detection = None
         while True:
-            if not capture_queue.empty():
-                image_data = capture_queue.get()
-                detected, _ = detect_view(image_data, templates)
+            frame = stream.wait_for_frame(last_seq, timeout=1.0)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            with span("frame"):
+                detected = detector.detect(frame.image)
                 if detected:
-                    view = determine_final_view(detected)
-                    label.config(text=f"Vue détectée: {view}")
-                    
-                    # Si une action manuelle est effectuée, on logue et mesure la latence
-                    log_user_action("Vue détectée", view)
-                    measure_latency()
-            time.sleep(0.05)  # Fréquence de traitement des images
-
-    # Lancer les threads de capture et de traitement
-    capture_thread_instance = Thread(target=capture_thread, daemon=True)
-    capture_thread_instance.start()
-
+                    # Écran inchangé: on garde la vue déjà déterminée
+                    if detector.changed or view is None:
+                        with span("view_decision"):
+                            view = determine_final_view(detected)
+                    with span("ui"):
+                        label.config(text=f"Vue détectée: {view}")
+
+            if detected:
+                log_user_action("Vue détectée", view)
+                # Intervalle entre deux détections (capture comprise)
+                now = time.perf_counter()
+                if last_detection is not None:
+                    tracing.observe("detection_interval", now - last_detection)
+                    event_log.event("latency", seconds=round(now - last_detection, 4))
+                last_detection = now
+
+    # Lancer le thread de traitement
     process_thread_instance = Thread(target=process_thread, daemon=True)
     process_thread_instance.start()
 
     root.mainloop()
+    event_log.close()
+    tracing.write_prometheus('pipeline_metrics.prom')
+    print(tracing.report())
 
 if __name__ == "__main__":
     main_loop()
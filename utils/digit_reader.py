@@ -0,0 +1,173 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+DIGITS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "tests", "templates", "digits")
+GLYPH_SIZE = (12, 16)  # Largeur, hauteur d'un caractère normalisé
+LABEL_FILES = {"%": "percent"}  # Caractères qui ne peuvent pas servir de nom de fichier
+
+
+def loading_mask(roi):
+    """Masque binaire du texte clair (même prétraitement que l'OCR Tesseract)"""
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    mask = cv2.inRange(blurred, 180, 255)
+    kernel = np.ones((2, 2), np.uint8)
+    return cv2.dilate(mask, kernel, iterations=1)
+
+
+def segment_glyphs(mask, min_height_ratio=0.4, min_area=4):
+    """Découpe le masque en caractères, de gauche à droite
+
+    Les composantes connexes qui se chevauchent horizontalement sont
+    fusionnées (le « % » est formé de plusieurs morceaux). Retourne une
+    liste de (x1, x2, masque du caractère).
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = [stats[i] for i in range(1, count) if stats[i, cv2.CC_STAT_AREA] >= min_area]
+    if not boxes:
+        return []
+
+    boxes.sort(key=lambda s: s[cv2.CC_STAT_LEFT])
+    merged = []
+    for x, y, w, h, _ in boxes:
+        if merged and x < merged[-1][2]:
+            last = merged[-1]
+            merged[-1] = [last[0], min(last[1], y), max(last[2], x + w), max(last[3], y + h)]
+        else:
+            merged.append([x, y, x + w, y + h])
+
+    max_height = max(y2 - y1 for _, y1, _, y2 in merged)
+    return [(x1, x2, mask[y1:y2, x1:x2]) for x1, y1, x2, y2 in merged
+            if y2 - y1 >= max_height * min_height_ratio]
+
+
+def glyph_vectors(glyphs):
+    """Vecteurs centrés-normés (N, D) des caractères, pour une corrélation par produit scalaire"""
+    if not glyphs:
+        return np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+    vectors = np.stack([
+        cv2.resize(glyph, GLYPH_SIZE, interpolation=cv2.INTER_AREA).ravel()
+        for glyph in glyphs
+    ]).astype(np.float32)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+class DigitReader:
+    """Lecture rapide du pourcentage de chargement sans lancer Tesseract
+
+    Les caractères sont découpés dans le masque seuillé/dilaté puis comparés
+    à un petit jeu de modèles (0-9 et %) construit une fois à partir de
+    captures (build_templates). Tesseract n'est appelé qu'en secours, si
+    aucun modèle n'existe ou si la lecture est incertaine. Les résultats
+    sont mis en cache par empreinte de la ROI: une barre de progression
+    inchangée n'est jamais relue.
+    """
+
+    def __init__(self, templates_dir=DIGITS_DIR, min_score=0.7, fallback=None, cache_size=64):
+        self.templates_dir = templates_dir
+        self.min_score = min_score
+        self.fallback = fallback  # fonction(masque) -> int ou None
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.labels = []
+        self.vectors = np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+        self.load_templates()
+
+    def load_templates(self):
+        """Charge les modèles <caractère>.png du dossier"""
+        labels, glyphs = [], []
+        names = {name: label for label, name in LABEL_FILES.items()}
+        for path in sorted(glob.glob(os.path.join(self.templates_dir, "*.png"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            glyph = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if glyph is not None:
+                labels.append(names.get(name, name))
+                glyphs.append(glyph)
+        self.labels = labels
+        self.vectors = glyph_vectors(glyphs)
+
+    def build_templates(self, samples, save=True):
+        """Construit les modèles à partir de ROI étiquetées [(roi, "42%"), ...]
+
+        Seuls les échantillons dont le nombre de caractères découpés correspond
+        au texte sont utilisés; les caractères identiques sont moyennés.
+        """
+        collected = {}
+        for roi, text in samples:
+            glyphs = segment_glyphs(loading_mask(roi))
+            text = text.replace(" ", "")
+            if len(glyphs) != len(text):
+                print(f"Échantillon ignoré '{text}': {len(glyphs)} caractères découpés")
+                continue
+            for char, (_, _, glyph) in zip(text, glyphs):
+                resized = cv2.resize(glyph, GLYPH_SIZE, interpolation=cv2.INTER_AREA)
+                collected.setdefault(char, []).append(resized.astype(np.float32))
+
+        templates = {char: np.mean(items, axis=0).astype(np.uint8) for char, items in collected.items()}
+        if save:
+            os.makedirs(self.templates_dir, exist_ok=True)
+            for char, glyph in templates.items():
+                cv2.imwrite(os.path.join(self.templates_dir, f"{LABEL_FILES.get(char, char)}.png"), glyph)
+            self.load_templates()
+        else:
+            self.labels = list(templates)
+            self.vectors = glyph_vectors(list(templates.values()))
+        self._cache.clear()
+        return sorted(templates)
+
+    def read_text(self, mask):
+        """Reconnaît les caractères du masque, retourne (texte, score minimal)"""
+        glyphs = segment_glyphs(mask)
+        if not glyphs or not self.labels:
+            return "", 0.0
+        scores = glyph_vectors([g for _, _, g in glyphs]) @ self.vectors.T
+        best = scores.argmax(axis=1)
+        text = "".join(self.labels[i] for i in best)
+        return text, float(scores[np.arange(len(best)), best].min())
+
+    def read_percentage(self, image, roi_coords):
+        """Pourcentage affiché dans la zone roi_coords (x, y, w, h), ou None"""
+        x, y, w, h = roi_coords
+        roi = np.ascontiguousarray(image[y:y+h, x:x+w])
+        key = hashlib.blake2b(roi.data, digest_size=16).digest()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        mask = loading_mask(roi)
+        text, score = self.read_text(mask)
+        match = re.search(r'(\d{1,3})%', text)
+        if match and score >= self.min_score:
+            value = int(match.group(1))
+        elif self.fallback is not None:
+            value = self.fallback(mask)
+        else:
+            value = None
+
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit les modèles de chiffres à partir de captures")
+    parser.add_argument("--roi", type=int, nargs=4, metavar=("X", "Y", "W", "H"), required=True)
+    parser.add_argument("samples", nargs="+", help="Paires image texte, ex: capture1.png 42%%")
+    args = parser.parse_args()
+
+    pairs = list(zip(args.samples[::2], args.samples[1::2]))
+    x, y, w, h = args.roi
+    rois = [(cv2.imread(path)[y:y+h, x:x+w], text) for path, text in pairs]
+    chars = DigitReader().build_templates(rois)
+    print(f"Modèles enregistrés dans {DIGITS_DIR}: {' '.join(chars)}")
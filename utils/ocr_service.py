@@ -0,0 +1,146 @@
+import importlib.util
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_CONFIG = r'--psm 7 --oem 3 -l fra+eng'
+
+
+def parse_config(config):
+    """Extrait langue, psm, oem et variables -c d'une configuration style pytesseract"""
+    lang = re.search(r"-l\s+(\S+)", config)
+    psm = re.search(r"--psm\s+(\d+)", config)
+    oem = re.search(r"--oem\s+(\d+)", config)
+    variables = tuple(sorted(re.findall(r"-c\s+(\w+)=(\S+)", config)))
+    return (lang.group(1) if lang else "eng",
+            int(psm.group(1)) if psm else 3,
+            int(oem.group(1)) if oem else 3,
+            variables)
+
+
+_local = threading.local()
+
+
+def _tesserocr_read(image, config):
+    """Lecture via une instance Tesseract chaude propre au thread (une par configuration)"""
+    import tesserocr
+    lang, psm, oem, variables = parse_config(config)
+    apis = getattr(_local, "apis", None)
+    if apis is None:
+        apis = _local.apis = {}
+    api = apis.get((lang, oem, variables))
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(lang=lang, oem=oem)
+        for name, value in variables:
+            api.SetVariable(name, value)
+        apis[(lang, oem, variables)] = api
+
+    image = np.ascontiguousarray(image)
+    height, width = image.shape[:2]
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    if channels == 3:
+        image = np.ascontiguousarray(image[:, :, ::-1])  # BGR -> RGB
+    api.SetPageSegMode(psm)
+    api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+    return api.GetUTF8Text()
+
+
+def _pytesseract_read(image, config):
+    import pytesseract
+    return pytesseract.image_to_string(image, config=config)
+
+
+def has_tesserocr():
+    """tesserocr est optionnel (pas de roue Windows sur PyPI): installé à part si disponible"""
+    return importlib.util.find_spec("tesserocr") is not None
+
+
+class OcrService:
+    """Service OCR partagé: instances Tesseract gardées chaudes entre les appels
+
+    Avec tesserocr (API C, optionnel), chaque thread du pool garde ses
+    instances initialisées: plus de lancement de processus ni de chargement
+    des modèles à chaque appel, et le GIL est relâché pendant la
+    reconnaissance. Sans tesserocr, les appels passent par pytesseract dans
+    un pool de processus de longue durée.
+    """
+
+    def __init__(self, workers=None, history=1000):
+        self.workers = workers or os.cpu_count() or 1
+        if has_tesserocr():
+            self.backend = "tesserocr"
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+            self._read = _tesserocr_read
+        else:
+            self.backend = "pytesseract"
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._read = _pytesseract_read
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._calls = 0
+        self._latencies = deque(maxlen=history)
+
+    def submit(self, image, config=DEFAULT_CONFIG):
+        """Soumet une ROI, retourne un Future du texte reconnu"""
+        started = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(self._read, image, config)
+        future.add_done_callback(lambda _: self._done(started))
+        return future
+
+    def _done(self, started):
+        with self._lock:
+            self._pending -= 1
+            self._calls += 1
+            self._latencies.append(time.perf_counter() - started)
+
+    def read(self, image, config=DEFAULT_CONFIG):
+        return self.submit(image, config).result()
+
+    def read_batch(self, items, default_config=DEFAULT_CONFIG):
+        """Lit un lot de ROI; items: images ou paires (image, config). Résultats dans l'ordre"""
+        futures = []
+        for item in items:
+            image, config = item if isinstance(item, tuple) else (item, default_config)
+            futures.append(self.submit(image, config))
+        return [future.result() for future in futures]
+
+    @property
+    def queue_depth(self):
+        """Nombre de ROI soumises et pas encore lues"""
+        return self._pending
+
+    def metrics(self):
+        """Profondeur de file et latences par appel (ms) sur l'historique récent"""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            metrics = {'backend': self.backend, 'queue_depth': self._pending, 'calls': self._calls}
+        if len(latencies):
+            metrics.update({
+                'last_ms': float(latencies[-1]),
+                'mean_ms': float(latencies.mean()),
+                'p95_ms': float(np.percentile(latencies, 95)),
+            })
+        return metrics
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ocr_service():
+    """Service OCR unique du processus (créé au premier appel)"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = OcrService()
+        return _service
@@ -1,8 +1,98 @@
+import glob
+import json
+import os
+
 import cv2
 import numpy as np
 
+from core.tracing import span
+
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration_logs")
+MAX_COLOR_DISTANCE = 442  # 442 = max distance couleur possible
+
+
+class SignatureClassifier:
+    """Classifieur de vues par signatures de pixels (plusieurs points par vue)
+
+    Tous les points de toutes les vues sont regroupés dans des tableaux:
+    une seule indexation numpy lit tous les pixels, puis la distance
+    moyenne à la signature de chaque vue est calculée en une opération.
+    """
+
+    def __init__(self, signatures, threshold=0.85):
+        # signatures: {vue: [((x, y), (b, g, r)), ...]}
+        self.views = list(signatures)
+        self.threshold = threshold
+        coords, colors, owners = [], [], []
+        for index, view_name in enumerate(self.views):
+            for (x, y), color in signatures[view_name]:
+                coords.append((x, y))
+                colors.append(color)
+                owners.append(index)
+        coords = np.array(coords, dtype=np.intp).reshape(-1, 2)
+        self.xs, self.ys = coords[:, 0], coords[:, 1]
+        self.colors = np.array(colors, dtype=np.float32).reshape(-1, 3)
+        self.owners = np.array(owners, dtype=np.intp)
+        self._valid_cache = {}
+
+    @classmethod
+    def from_calibration_logs(cls, directory=CALIBRATION_DIR, threshold=0.85):
+        """Construit le classifieur à partir des fichiers calibration_logs/*.json
+
+        Pour chaque mode, le fichier le plus récent est utilisé. Les couleurs
+        des journaux sont en RGB, les captures en BGR.
+        """
+        latest = {}
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    log = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Journal de calibration illisible {path}: {str(e)}")
+                continue
+            mode, timestamp = log.get("mode"), log.get("timestamp", "")
+            if mode and log.get("pixel_data") and timestamp >= latest.get(mode, ("", None))[0]:
+                latest[mode] = (timestamp, log["pixel_data"])
+
+        signatures = {
+            mode: [(tuple(p["coord"]), tuple(reversed(p["rgb"]))) for p in pixel_data]
+            for mode, (_, pixel_data) in sorted(latest.items())
+        }
+        return cls(signatures, threshold)
+
+    def _valid_points(self, shape):
+        """Masque des points situés dans l'image (mis en cache par résolution)"""
+        key = shape[:2]
+        valid = self._valid_cache.get(key)
+        if valid is None:
+            valid = (self.xs < shape[1]) & (self.ys < shape[0])
+            counts = np.bincount(self.owners[valid], minlength=len(self.views))
+            valid = self._valid_cache[key] = (valid, counts)
+        return valid
+
+    def scores(self, screenshot):
+        """Confiance de chaque vue (tableau aligné sur self.views)"""
+        valid, counts = self._valid_points(screenshot.shape)
+        pixels = screenshot[self.ys[valid], self.xs[valid], :3].astype(np.float32)
+        distances = np.sqrt(((pixels - self.colors[valid]) ** 2).sum(axis=1))
+        totals = np.bincount(self.owners[valid], weights=distances, minlength=len(self.views))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            confidences = 1 - (totals / counts) / MAX_COLOR_DISTANCE
+        return np.where(counts > 0, confidences, 0.0)
+
+    def classify(self, screenshot):
+        """Retourne (vue, confiance) de la meilleure vue au-dessus du seuil"""
+        if not self.views:
+            return ('inconnu', 0)
+        confidences = self.scores(screenshot)
+        best = int(np.argmax(confidences))
+        if confidences[best] > self.threshold:
+            return (self.views[best], float(confidences[best]))
+        return ('inconnu', 0)
+
+
 class ViewDetector:
-    def __init__(self):
+    def __init__(self, calibration_dir=CALIBRATION_DIR):
         # Points caractéristiques pour chaque vue (à calibrer)
         self.view_templates = {
             'ville': {
@@ -18,17 +108,15 @@ class ViewDetector:
             # ... autres modes
         }
 
+        # Signatures issues des journaux de calibration, sinon un point par vue
+        self.classifier = SignatureClassifier.from_calibration_logs(calibration_dir)
+        if not self.classifier.views:
+            self.classifier = SignatureClassifier({
+                view_name: [(params['position'], params['color'])]
+                for view_name, params in self.view_templates.items()
+            })
+
     def detect_current_view(self, screenshot):
         """Détecte le mode de vue actuel"""
-        view_confidences = {}
-        
-        for view_name, params in self.view_templates.items():
-            # Vérification couleur au point spécifié
-            pixel_color = screenshot[params['position'][1], params['position'][0]]
-            color_diff = np.linalg.norm(pixel_color - params['color'])
-            confidence = 1 - (color_diff / 442)  # 442 = max distance couleur possible
-            
-            if confidence > params['threshold']:
-                view_confidences[view_name] = confidence
-                
-        return max(view_confidences.items(), key=lambda x: x[1], default=('inconnu', 0))
\ No newline at end of file
+        with span("view_decision"):
+            return self.classifier.classify(screenshot)